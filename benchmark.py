@@ -0,0 +1,194 @@
+"""Benchmarks for the data-processing pipeline
+
+Each stage runs in a freshly spawned process so the reported peak RSS
+belongs to that stage alone. Stages never touch Supabase, and only the
+browser stage uses the network (it loads live SwimCloud roster pages, and its
+full profile opens a visible window, so run it under xvfb-run on a server).
+
+    python benchmark.py                 # every offline stage
+    python benchmark.py conversion      # just one
+    xvfb-run python benchmark.py browser
+"""
+import argparse
+import multiprocessing
+import queue
+import resource
+import sys
+import tempfile
+import time
+import traceback
+from pathlib import Path
+
+
+def bench_conversion():
+    """Excel rosters -> SwimmerRecords -> swimmers.json and rankings"""
+    from convert_to_elo import convert_rosters, save_swimmers_json
+    from rankings import EventRankings, export_rankings
+
+    swimmers = convert_rosters(fetch_images=False)
+    with tempfile.TemporaryDirectory() as tmp:
+        save_swimmers_json(swimmers, str(Path(tmp) / 'swimmers.json'))
+        export_rankings(EventRankings.from_records(swimmers.values()), tmp)
+    return {'swimmers': len(swimmers)}
+
+
+def bench_time_parser(n=200_000, seed=7):
+    """Batch-parse generated times; round-trip and fuzz checks fail the stage loudly"""
+    import random
+    import numpy as np
+    from time_parser import format_time, parse_time, parse_times, error_counts, reset_error_counts
+
+    rng = random.Random(seed)
+    expected = np.array([round(rng.uniform(9.0, 4000.0), 2) for _ in range(n)])
+    strings = [format_time(seconds) for seconds in expected]
+
+    start = time.perf_counter()
+    parsed = parse_times(strings)
+    elapsed = time.perf_counter() - start
+    worst = float(np.max(np.abs(parsed - expected)))
+    assert worst < 1e-3, f"round-trip error {worst}"
+
+    # Fuzz: arbitrary junk must never raise, only count errors
+    reset_error_counts()
+    alphabet = '0123456789:.rRxX DQNT-*'
+    for _ in range(n // 4):
+        parse_time(''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 12))))
+    assert parse_time('1:05:57.00') == 3957.0 and parse_time('59.5') == 59.5
+    assert parse_time('22.10r') is None and parse_time('DQ') is None and parse_time('1:75.00') is None
+
+    return {'times_per_sec': int(n / elapsed), 'max_error': round(worst, 6),
+            'fuzz_rejects': sum(error_counts().values())}
+
+
+def browser_memory_mb(driver):
+    """Resident memory of chromedriver and every Chrome process under it"""
+    import psutil
+
+    root = psutil.Process(driver.service.process.pid)
+    total = 0
+    for process in [root] + root.children(recursive=True):
+        try:
+            total += process.memory_info().rss
+        except psutil.NoSuchProcess:
+            continue
+    return total / (1024 * 1024)
+
+
+def bench_browser(pages=5):
+    """Roster page loads with the lean scraping profile vs the full browser profile
+
+    Chrome runs in child processes, so memory here is their summed RSS
+    (peak across the page loads), not this stage's own peak.
+    """
+    from convert_to_elo import roster_files
+    from roster_scraper import setup_driver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    team_ids = [f.stem.split('_')[1] for f in roster_files(Path('output'))][:pages]
+    assert team_ids, "benchmark needs roster files in output/ to pick team pages"
+
+    results = {}
+    for profile, lean in (('full', False), ('lean', True)):
+        driver = setup_driver(lean=lean)
+        try:
+            # Warm-up load so driver startup and cold caches aren't counted
+            driver.get(f"https://www.swimcloud.com/team/{team_ids[0]}/roster/")
+            times, peak = [], 0.0
+            for team_id in team_ids:
+                start = time.perf_counter()
+                driver.get(f"https://www.swimcloud.com/team/{team_id}/roster/")
+                WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.TAG_NAME, "tbody")))
+                times.append(time.perf_counter() - start)
+                peak = max(peak, browser_memory_mb(driver))
+        finally:
+            driver.quit()
+        results[f'{profile}_page_s'] = round(sum(times) / len(times), 3)
+        results[f'{profile}_browser_mb'] = round(peak, 1)
+
+    results['speedup'] = round(results['full_page_s'] / results['lean_page_s'], 2)
+    results['memory_ratio'] = round(results['full_browser_mb'] / results['lean_browser_mb'], 2)
+    return results
+
+
+BENCHMARKS = {
+    'conversion': bench_conversion,
+    'time_parser': bench_time_parser,
+    'browser': bench_browser,
+}
+# Run when no stages are named; the browser stage needs Chrome and the network
+DEFAULT_STAGES = ['conversion', 'time_parser']
+STAGE_TIMEOUT = 1800    # Seconds before a stage that never reports is treated as hung
+
+
+def _run_stage(name, results):
+    try:
+        start = time.perf_counter()
+        extra = BENCHMARKS[name]()
+        elapsed = time.perf_counter() - start
+    except Exception:
+        # Hand the failure to the parent instead of leaving it waiting on the queue
+        results.put(('error', traceback.format_exc()))
+        return
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    results.put(('ok', (elapsed, peak_mb, extra)))
+
+
+def run_isolated(name, timeout=STAGE_TIMEOUT):
+    """Run one benchmark in a spawned process: (seconds, peak RSS in MB, stage info)
+
+    Raises RuntimeError if the stage fails, dies or runs past `timeout` seconds.
+    """
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=_run_stage, args=(name, results))
+    process.start()
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            status, outcome = results.get(timeout=1)
+            break
+        except queue.Empty:
+            if not process.is_alive():
+                # Died without reporting (killed, crashed in native code, ...)
+                raise RuntimeError(f"Stage {name} exited with code {process.exitcode} without a result")
+            if time.monotonic() > deadline:
+                process.terminate()
+                process.join()
+                raise RuntimeError(f"Stage {name} produced no result within {timeout}s")
+    process.join()
+    if status == 'error':
+        raise RuntimeError(f"Stage {name} failed:\n{outcome}")
+    return outcome
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark pipeline stages')
+    parser.add_argument('stages', nargs='*', help=f"Stages to run: {', '.join(BENCHMARKS)} (default: {', '.join(DEFAULT_STAGES)})")
+    parser.add_argument('--timeout', type=float, default=STAGE_TIMEOUT, help='Seconds allowed per stage')
+    args = parser.parse_args()
+    unknown = [name for name in args.stages if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+
+    report = []
+    failed = []
+    for name in args.stages or DEFAULT_STAGES:
+        print(f"\nRunning {name}...", file=sys.stderr)
+        try:
+            report.append((name, *run_isolated(name, args.timeout)))
+        except RuntimeError as e:
+            print(e, file=sys.stderr)
+            failed.append(name)
+
+    print(f"\n{'stage':<20} {'seconds':>10} {'peak RSS MB':>12}  details")
+    print("-" * 60)
+    for name, elapsed, peak_mb, extra in report:
+        details = ', '.join(f"{k}={v}" for k, v in extra.items())
+        print(f"{name:<20} {elapsed:>10.3f} {peak_mb:>12.1f}  {details}")
+
+    if failed:
+        sys.exit(f"Failed stages: {', '.join(failed)}")
@@ -4,21 +4,27 @@ import os
 from pathlib import Path
 import requests
 from bs4 import BeautifulSoup
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
 import threading
 from tqdm import tqdm
 import time
-from supabase import create_client, Client
-from dotenv import load_dotenv
 import argparse
 import sys
-
-# Load environment variables
-load_dotenv()
-supabase: Client = create_client(
-    os.getenv('SUPABASE_URL'),
-    os.getenv('SUPABASE_KEY')
-)
+import db
+from db import get_supabase
+from events import add_best_time
+from image_cache import mirror_profile_images
+from rankings import EventRankings, export_rankings
+from publish import publish_swimmers, serialize, write_document
+from records import SwimmerRecord
+from search import SearchIndex, export_search_index
+from teams import export_team_aggregates, sync_team_stats, team_aggregates
+import seeding
+import snapshot
+import swimmer_page
+import sync_log
+from time_parser import parse_time, error_counts
 
 # Add a rate limiter to prevent overloading
 class RateLimiter:
@@ -38,31 +44,7 @@ rate_limiter = RateLimiter(max_per_second=20)  # Adjust rate as needed
 
 def convert_times_to_seconds(time_str):
     """Convert swimming time string to seconds"""
-    if not isinstance(time_str, str):
-        return None
-    
-    try:
-        # Remove any whitespace
-        time_str = time_str.strip()
-        
-        # Handle minute:second.millisecond format
-        if ':' in time_str:
-            minutes, rest = time_str.split(':')
-            if '.' in rest:
-                seconds, milliseconds = rest.split('.')
-                return float(minutes) * 60 + float(seconds) + float(milliseconds) / 100
-            else:
-                return float(minutes) * 60 + float(rest)
-        # Handle second.millisecond format
-        elif '.' in time_str:
-            seconds, milliseconds = time_str.split('.')
-            return float(seconds) + float(milliseconds) / 100
-        # Handle just seconds
-        else:
-            return float(time_str)
-    except Exception as e:
-        print(f"Error converting time {time_str}: {e}")
-        return None
+    return parse_time(time_str)
 
 def get_profile_image(swimmer_id):
     """Get profile image URL from swimmer page"""
@@ -81,13 +63,19 @@ def get_profile_image(swimmer_id):
         print(f"Error fetching profile for {swimmer_id}: {e}")
     return None
 
-def process_swimmer(row):
+def none_if_nan(value):
+    """Excel blanks come through pandas as NaN; store them as None"""
+    return None if pd.isna(value) else value
+
+def process_swimmer(row, fetch_images=True):
     """Process a single swimmer (for parallel processing)"""
     try:
         swimmer_id = str(row['Swimmer ID'])
         
         # Get profile image URL from swimmer page
-        profile_image = get_profile_image(swimmer_id) if not pd.notna(row.get('Profile Image')) else row.get('Profile Image')
+        profile_image = none_if_nan(row.get('Profile Image'))
+        if profile_image is None and fetch_images:
+            profile_image = get_profile_image(swimmer_id)
         
         name_parts = row['Name'].split()
         initials = ''.join(part[0] for part in name_parts if part)[:2].upper()
@@ -103,237 +91,255 @@ def process_swimmer(row):
                         time = parts[1].strip()
                         seconds = convert_times_to_seconds(time)
                         if seconds:
-                            best_times[event] = {
-                                'time': time,
-                                'seconds': seconds
-                            }
+                            add_best_time(best_times, event, time, seconds)
                 except Exception as e:
                     continue
 
-        # Clean social media links
-        twitter = row.get('Twitter')
-        twitter = None if pd.isna(twitter) else twitter
-        instagram = row.get('Instagram')
-        instagram = None if pd.isna(instagram) else instagram
-
-        return {
-            'id': swimmer_id,
-            'name': row['Name'],
-            'team': row['Current Team'] if pd.notna(row['Current Team']) else "Unknown",
-            'best_times': best_times,
-            'elo': 1500,
-            'ratings_count': 0,
-            'profile_image': profile_image,
-            'initials': initials if not profile_image else None,
-            'twitter': twitter,
-            'instagram': instagram
-        }
+        return SwimmerRecord(
+            id=swimmer_id,
+            name=row['Name'],
+            team=row['Current Team'] if pd.notna(row['Current Team']) else "Unknown",
+            best_times=SwimmerRecord.pack_best_times(best_times),
+            profile_image=profile_image,
+            initials=initials if not profile_image else None,
+            twitter=none_if_nan(row.get('Twitter')),
+            instagram=none_if_nan(row.get('Instagram'))
+        )
     except Exception as e:
         print(f"Error processing swimmer {row.get('Name', 'Unknown')}: {e}")
         return None
 
-def process_excel_files():
-    """Convert all Excel files to a single JSON with ELO ratings using parallel processing"""
-    output_dir = Path("output")
-    swimmers = {}
-    
-    # Get total number of swimmers for progress bar
-    total_swimmers = 0
-    dfs = []
-    for excel_file in output_dir.glob("team_*_roster.xlsx"):
+def roster_files(output_dir):
+    """Team roster files in team ID order"""
+    return sorted(output_dir.glob("team_*_roster.xlsx"), key=lambda f: int(f.stem.split('_')[1]))
+
+def build_swimmer_index(output_dir):
+    """Swimmer ID -> roster files listing them, in first-seen order, from the ID column alone"""
+    index = {}
+    for excel_file in roster_files(output_dir):
+        for swimmer_id in pd.read_excel(excel_file, usecols=['Swimmer ID'])['Swimmer ID'].dropna():
+            index.setdefault(str(swimmer_id), []).append(excel_file.name)
+    return index
+
+def iter_roster_rows(output_dir):
+    """Yield roster rows as dicts, holding only one team's DataFrame at a time"""
+    for excel_file in roster_files(output_dir):
         df = pd.read_excel(excel_file)
-        total_swimmers += len(df)
-        dfs.append(df)
         print(f"Found {len(df)} swimmers in {excel_file.name}")
+        columns = list(df.columns)
+        for values in df.itertuples(index=False, name=None):
+            yield dict(zip(columns, values))
+        del df
 
-    print(f"\nProcessing {total_swimmers} swimmers...")
-    
-    # Process all swimmers in parallel
-    with ThreadPoolExecutor(max_workers=min(32, os.cpu_count() * 4)) as executor:
-        futures = []
-        for df in dfs:
-            for _, row in df.iterrows():
-                futures.append(executor.submit(process_swimmer, row))
-        
-        # Process results with progress bar
-        with tqdm(total=len(futures), desc="Converting swimmers") as pbar:
-            for future in as_completed(futures):
+def merge_roster_rows(rows):
+    """Merge one swimmer's rows from several rosters (transfers) into a single row
+
+    The row with a Current Team and the most best times wins, ties going to the
+    lower team ID. Teams are unioned, best times are concatenated (the fastest
+    per event is kept when parsed), and missing links are filled from other rows.
+    """
+    def completeness(row):
+        best_times = row.get('Best Times')
+        return (pd.notna(row.get('Current Team')),
+                len(best_times.split(';')) if isinstance(best_times, str) else 0)
+
+    ordered = sorted(rows, key=completeness, reverse=True)
+    merged = dict(ordered[0])
+
+    teams = []
+    for row in ordered:
+        if isinstance(row.get('Teams'), str):
+            for team in row['Teams'].split(','):
+                team = team.strip()
+                if team and team not in teams:
+                    teams.append(team)
+        for column in ('Profile Image', 'Twitter', 'Instagram'):
+            if pd.isna(merged.get(column)) and pd.notna(row.get(column)):
+                merged[column] = row[column]
+
+    if pd.isna(merged.get('Current Team')) and teams:
+        merged['Current Team'] = teams[0]
+    merged['Teams'] = ', '.join(teams) if teams else None
+    best_times = [row['Best Times'] for row in ordered if isinstance(row.get('Best Times'), str)]
+    merged['Best Times'] = '; '.join(best_times) if best_times else None
+    return merged
+
+def convert_rosters(output_dir="output", fetch_images=True, max_workers=None):
+    """Convert every roster row into a SwimmerRecord, keyed by swimmer ID in roster order"""
+    output_dir = Path(output_dir)
+    max_workers = max_workers or min(32, os.cpu_count() * 4)
+    swimmers = {}
+
+    # Index every ID up front so swimmers on several rosters are processed (and fetched) once
+    index = build_swimmer_index(output_dir)
+    held = {swimmer_id: [] for swimmer_id, files in index.items() if len(files) > 1}
+    print(f"\nProcessing {len(index)} swimmers ({len(held)} listed on more than one roster)...")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor, \
+            tqdm(total=len(index), desc="Converting swimmers") as pbar:
+
+        def collect(done):
+            for future in done:
                 try:
                     result = future.result()
                     if result:
-                        swimmers[result['id']] = result
-                    pbar.update(1)
+                        swimmers[result.id] = result
                 except Exception as e:
                     print(f"Error processing swimmer: {e}")
-                    pbar.update(1)
-    
-    # Custom JSON encoder to handle NaN values
-    class CustomJSONEncoder(json.JSONEncoder):
-        def default(self, obj):
-            if pd.isna(obj) or obj is pd.NaT:
-                return None
-            return super().default(obj)
-        
-        def encode(self, obj):
-            if isinstance(obj, dict):
-                return super().encode({
-                    k: (None if pd.isna(v) else v)
-                    for k, v in obj.items()
-                })
-            return super().encode(obj)
-
-    # Save to JSON file with custom encoder
-    os.makedirs('public', exist_ok=True)
-    with open('public/swimmers.json', 'w') as f:
-        json.dump(swimmers, f, cls=CustomJSONEncoder)
-    
-    print(f"\nProcessed {len(swimmers)} swimmers successfully")
-    print(f"Data saved to public/swimmers.json")
+                pbar.update(1)
+
+        # Keep a bounded number of rows in flight instead of a future per swimmer up front
+        pending = set()
+        for row in iter_roster_rows(output_dir):
+            if pd.isna(row.get('Swimmer ID')):
+                continue
+            swimmer_id = str(row['Swimmer ID'])
+            if swimmer_id in held:
+                # Wait until every copy has been read, then merge them
+                held[swimmer_id].append(row)
+                if len(held[swimmer_id]) < len(index[swimmer_id]):
+                    continue
+                row = merge_roster_rows(held.pop(swimmer_id))
+
+            if len(pending) >= max_workers * 4:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending.add(executor.submit(process_swimmer, row, fetch_images))
+        collect(wait(pending).done)
+
+    errors = error_counts()
+    if errors:
+        print(f"Skipped {sum(errors.values())} unparseable times: "
+              + ", ".join(f"{count} {reason}" for reason, count in sorted(errors.items())))
+
+    # Completion order varies between runs; roster order doesn't
+    return {swimmer_id: swimmers[swimmer_id] for swimmer_id in index if swimmer_id in swimmers}
+
+def save_swimmers_json(swimmers, path='public/swimmers.json'):
+    """Write swimmers.json, serializing one record at a time rather than building the whole document"""
+    write_document(serialize(swimmers), path)
+
+def load_published_ratings(path='public/swimmers.json'):
+    """Swimmer ID -> {'elo', 'ratings_count'} from the last published swimmers.json, or {}"""
+    try:
+        with open(path) as f:
+            published = json.load(f)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"No published ratings to fall back on ({e})")
+        return {}
+    return {
+        swimmer_id: {'elo': swimmer.get('elo'), 'ratings_count': swimmer.get('ratings_count')}
+        for swimmer_id, swimmer in published.items()
+    }
+
+def rating_rows(swimmers, rated):
+    """Supabase swimmer_ratings rows as two lazy streams: (name/team-only rows, full rows)
 
-    # Update Supabase - also handle NaN values
+    Swimmers in `rated` already have votes, and their elo/ratings_count belong
+    to the vote worker, so only their name and team are written; everyone else
+    gets their full row with the seeded rating.
+    """
+    named = ({'id': record.id, 'name': record.name, 'team': record.team}
+             for record in swimmers.values() if record.id in rated)
+    full = (record.to_rating_row() for record in swimmers.values() if record.id not in rated)
+    return named, full
+
+def sync_ratings(swimmers, batch_size=100):
+    """Upsert swimmer_ratings rows in batches through the job log, resuming a failed sync"""
     print("\nUpdating Supabase database...")
-    supabase_data = []
-    for swimmer in swimmers.values():
-        # Convert any NaN values to None for Supabase
-        clean_swimmer = {
-            'id': swimmer['id'],
-            'name': swimmer['name'],
-            'team': None if pd.isna(swimmer['team']) else swimmer['team'],
-            'elo': float(swimmer['elo']),  # Ensure it's a float
-            'ratings_count': int(swimmer['ratings_count'])  # Ensure it's an int
-        }
-        supabase_data.append(clean_swimmer)
+    # Re-read right before writing: votes keep arriving while conversion runs
+    try:
+        rated = {row['id'] for row in db.fetch_ratings('id, ratings_count') if row['ratings_count']}
+    except Exception as e:
+        print(f"Error reading current ratings, not updating Supabase: {e}")
+        return
+    streams = rating_rows(swimmers, rated)
+    total_batches = sum((count + batch_size - 1) // batch_size
+                        for count in (len(rated & swimmers.keys()), len(swimmers.keys() - rated)))
+    # Each batch holds one kind of row, so every upsert sends the same columns
+    batches = (batch for rows in streams for batch in iter(lambda: list(islice(rows, batch_size)), []))
+
+    def upsert(batch):
+        get_supabase().table('swimmer_ratings').upsert(batch).execute()
+
+    sent, skipped, failed = sync_log.run_batches(sync_log.JobLog('swimmer_ratings'), batches, upsert, total_batches)
+    if failed:
+        print(f"Supabase update incomplete: {failed} of {total_batches} batches failed; "
+              f"re-run to send only the unfinished batches")
+    else:
+        print(f"Supabase update complete! ({sent} batches sent, {skipped} already applied)")
+
+def process_excel_files(mirror_images=False, take_snapshot=True, team_table=False):
+    """Convert all Excel files to a single JSON with ELO ratings using parallel processing"""
+    swimmers = convert_rosters()
 
+    # Keep ratings swimmers have earned from votes; seed everyone else from their times
     try:
-        # Just use upsert to update/insert records
-        batch_size = 100
-        for i in range(0, len(supabase_data), batch_size):
-            batch = supabase_data[i:i + batch_size]
-            result = supabase.table('swimmer_ratings').upsert(batch).execute()
-            print(f"Updated batch {i//batch_size + 1}/{(len(supabase_data) + batch_size - 1)//batch_size}")
-        
-        print("Supabase update complete!")
+        existing = {row['id']: row for row in db.fetch_ratings()}
+        sync = True
     except Exception as e:
-        print(f"Error updating Supabase: {e}")
+        # Without the current ratings a sync would reset them, so only write local files,
+        # keeping the ratings last published and the calibration last fitted
+        print(f"Error reading current ratings, not updating Supabase: {e}")
+        existing = load_published_ratings()
+        sync = False
+
+    if sync:
+        calibration = seeding.seed_records(swimmers.values(), existing)
+        calibration.save()
+    else:
+        calibration = seeding.seed_records(swimmers.values(), existing, seeding.SeedCalibration.load())
+    seeded = sum(1 for swimmer_id in swimmers if not existing.get(swimmer_id, {}).get('ratings_count'))
+    print(f"Seeded {seeded} unrated swimmers from their times "
+          f"(calibrated on {calibration.samples} rated swimmers)")
+
+    if mirror_images:
+        # Serve local thumbnails instead of hotlinking full-size remote images
+        mirror_profile_images(swimmers.values())
+
+    print(f"\nProcessed {len(swimmers)} swimmers successfully")
+    # Returning clients download only the patch since their version
+    publish_swimmers(swimmers)
+
+    # Precompute event leaderboards so clients don't sort best_times on every view
+    export_rankings(EventRankings.from_records(swimmers.values()))
+    # Name/team lookup with typo tolerance, without the client scanning every swimmer
+    export_search_index(SearchIndex.from_records(swimmers.values()))
+    # Team pages read one precomputed entry instead of scanning every swimmer
+    aggregates = export_team_aggregates(team_aggregates(swimmers.values()))
+
+    if not sync:
+        return
 
-# Add this at the top with other imports
-parser = argparse.ArgumentParser()
-parser.add_argument('--single-swimmer', type=str, help='Process a single swimmer ID')
-args = parser.parse_args()
+    if take_snapshot:
+        # Keep a copy of the table before upserting over it
+        try:
+            snapshot.backup()
+        except Exception as e:
+            print(f"Error taking snapshot, not updating Supabase: {e}")
+            return
+
+    sync_ratings(swimmers)
+    if team_table:
+        sync_team_stats(aggregates)
 
-# Add this new function
 def fetch_single_swimmer(swimmer_id):
     """Fetch data for a single swimmer from SwimCloud"""
     try:
-        url = f"https://www.swimcloud.com/swimmer/{swimmer_id}/"
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        }
-        
-        response = requests.get(url, headers=headers)
-        if response.status_code != 200:
-            raise Exception(f"Failed to fetch swimmer data: Status {response.status_code}")
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Get basic info
-        name = soup.find('h1', {'class': 'c-toolbar__title'}).text.strip()
-        
-        # Get team name from the toolbar meta section
-        team = "Unknown"
-        meta_div = soup.find('div', {'class': 'c-toolbar__meta'})
-        if meta_div:
-            team_link = meta_div.find('a', href=lambda x: x and x.startswith('/team/'))
-            if team_link:
-                team = team_link.text.strip()
-        
-        # Get best times using the same approach as roster_scraper.py
-        best_times = {}
-        
-        # Find all rows in the page
-        rows = soup.find_all("tr")
-        for row in rows:
-            time_td = row.find("td", class_="u-text-end u-text-semi")
-            event_td = row.find("td", class_="u-text-truncate")
-            if time_td and event_td:
-                event = event_td.text.strip()
-                time = time_td.text.strip()
-                
-                # Only process if we have both event and time
-                if event and time:
-                    seconds = convert_times_to_seconds(time)
-                    if seconds:
-                        # Format event name consistently
-                        event_parts = event.split()
-                        if len(event_parts) >= 3:
-                            distance = event_parts[0]
-                            course = event_parts[1][0].upper()  # Take first letter (Y/M) and capitalize
-                            stroke = ' '.join(event_parts[2:]).upper()  # Rest is the stroke
-                            formatted_event = f"{distance} {course} {stroke}"
-                            
-                            # Only update if it's a faster time or if we don't have this event yet
-                            if formatted_event not in best_times or seconds < best_times[formatted_event]['seconds']:
-                                best_times[formatted_event] = {
-                                    'time': time,
-                                    'seconds': seconds
-                                }
-                                print(f"Added/Updated time for {formatted_event}: {time} ({seconds}s)")
-        
-        # Get profile image
-        profile_image = None
-        media_div = soup.find('div', {'class': 'c-toolbar__media-user'})
-        if media_div:
-            img = media_div.find('img')
-            if img and 'src' in img.attrs:
-                profile_image = img['src']
-        
-        # Get social media links
-        social_links = soup.find_all('a', {'class': 'btn-icon-plain'})
-        twitter = None
-        instagram = None
-        for link in social_links:
-            href = link.get('href', '')
-            if 'twitter.com' in href:
-                twitter = href
-            elif 'instagram.com' in href:
-                instagram = href
-        
-        # Create swimmer data
-        swimmer_data = {
-            'id': swimmer_id,
-            'name': name,
-            'team': team,
-            'best_times': best_times,
-            'elo': 1500,
-            'ratings_count': 0,
-            'profile_image': profile_image,
-            'initials': ''.join(part[0] for part in name.split()[:2]).upper(),
-            'twitter': twitter,
-            'instagram': instagram
-        }
-        
-        # Update Supabase
-        supabase.table('swimmer_ratings').upsert({
-            'id': swimmer_id,
-            'name': name,
-            'team': team,
-            'elo': 1500,
-            'ratings_count': 0
-        }).execute()
-        
-        return swimmer_data
-        
+        return swimmer_page.add_swimmer(swimmer_id)
     except Exception as e:
         print(f"Error fetching swimmer {swimmer_id}: {e}", file=sys.stderr)
         return None
 
 # Modify the main execution
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--single-swimmer', type=str, help='Process a single swimmer ID')
+    parser.add_argument('--mirror-images', action='store_true', help='Cache profile images locally as thumbnails')
+    parser.add_argument('--no-snapshot', action='store_true', help='Skip the swimmer_ratings backup before syncing')
+    parser.add_argument('--team-table', action='store_true', help='Also upsert team aggregates into the team_stats table')
+    args = parser.parse_args()
+
     if args.single_swimmer:
         # Process single swimmer
         swimmer_data = fetch_single_swimmer(args.single_swimmer)
@@ -354,4 +360,5 @@ if __name__ == "__main__":
             print(json.dumps({"error": "Failed to fetch swimmer data"}))
     else:
         # Normal processing of all swimmers
-        process_excel_files() 
\ No newline at end of file
+        process_excel_files(mirror_images=args.mirror_images, take_snapshot=not args.no_snapshot,
+                            team_table=args.team_table)
\ No newline at end of file
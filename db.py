@@ -0,0 +1,60 @@
+"""Shared Supabase access for the data-processing scripts"""
+import os
+from functools import lru_cache
+
+from supabase import create_client
+
+from sync_log import with_retries
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    # Deployed functions get SUPABASE_URL/SUPABASE_KEY from their environment
+    pass
+
+TABLE = 'swimmer_ratings'
+PAGE_SIZE = 1000
+
+
+@lru_cache(maxsize=None)
+def get_supabase():
+    """Create the Supabase client on first use (needs SUPABASE_URL and SUPABASE_KEY)"""
+    return create_client(
+        os.getenv('SUPABASE_URL'),
+        os.getenv('SUPABASE_KEY')
+    )
+
+
+def has_credentials():
+    """True when the environment is configured to reach Supabase"""
+    return bool(os.getenv('SUPABASE_URL') and os.getenv('SUPABASE_KEY'))
+
+
+def fetch_range(low=None, high=None, columns='*', page_size=PAGE_SIZE, table=TABLE):
+    """Every row with low <= id < high (None = unbounded), paging on the last id seen
+
+    Keyset pages (id > last id) cost the same however deep they are, unlike
+    OFFSET pages, and disjoint ranges can be read in parallel.
+    """
+    rows = []
+    last_id = None
+    while True:
+        query = get_supabase().table(table).select(columns).order('id').limit(page_size)
+        if last_id is not None:
+            query = query.gt('id', last_id)
+        elif low is not None:
+            query = query.gte('id', low)
+        if high is not None:
+            query = query.lt('id', high)
+
+        page = with_retries(query.execute, f"reading {table} ids after {last_id or low}").data
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        last_id = page[-1]['id']
+
+
+def fetch_ratings(columns='id, elo, ratings_count', page_size=PAGE_SIZE):
+    """Read every swimmer_ratings row, one keyset page at a time"""
+    return fetch_range(columns=columns, page_size=page_size)
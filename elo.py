@@ -0,0 +1,30 @@
+"""Python port of src/utils/eloCalculator.js (keep the two in sync)"""
+
+MIN_K = 16
+MAX_K = 48
+CONFIDENCE_THRESHOLD = 30  # number of ratings before confidence is high
+
+
+def get_k_factor(ratings_count):
+    """K-factor decreases as number of ratings increases"""
+    if ratings_count < CONFIDENCE_THRESHOLD:
+        return MAX_K  # More volatile for new swimmers
+    factor = max(0, (CONFIDENCE_THRESHOLD - ratings_count) / CONFIDENCE_THRESHOLD)
+    return MIN_K + (MAX_K - MIN_K) * factor
+
+
+def get_volatility_factor(elo_diff):
+    """Reduce ELO changes for very mismatched pairs"""
+    base_diff = 400
+    if elo_diff <= base_diff:
+        return 1
+    return max(0.5, 1 - (elo_diff - base_diff) / 800)
+
+
+def calculate_new_elos(winner, loser):
+    """Same result as calculateNewElos: (winner_new_elo, loser_new_elo, elo_change)"""
+    k = (get_k_factor(winner.get('ratings_count') or 0) + get_k_factor(loser.get('ratings_count') or 0)) / 2
+    expected_score = 1 / (1 + 10 ** ((loser['elo'] - winner['elo']) / 400))
+    volatility_factor = get_volatility_factor(abs(winner['elo'] - loser['elo']))
+    elo_change = k * (1 - expected_score) * volatility_factor
+    return winner['elo'] + elo_change, loser['elo'] - elo_change, elo_change
@@ -0,0 +1,187 @@
+"""Canonical swimming events and a numeric best-times matrix built on them
+
+Only BestTimesMatrix needs NumPy, and it imports it itself: event parsing is
+also used by the single-swimmer add, which runs without NumPy installed.
+"""
+import re
+from typing import NamedTuple
+
+# Course letters as they appear in SwimCloud event names
+COURSES = ('Y', 'S', 'L')
+COURSE_CODES = {'Y': 'SCY', 'S': 'SCM', 'L': 'LCM'}
+COURSE_ALIASES = {
+    'Y': 'Y', 'YD': 'Y', 'YDS': 'Y', 'YARDS': 'Y', 'SCY': 'Y',
+    'S': 'S', 'SCM': 'S',
+    'L': 'L', 'LCM': 'L',
+}
+
+STROKES = ('Free', 'Back', 'Breast', 'Fly', 'IM')
+STROKE_ALIASES = {
+    'FREE': 'Free', 'FREESTYLE': 'Free', 'FR': 'Free',
+    'BACK': 'Back', 'BACKSTROKE': 'Back', 'BK': 'Back',
+    'BREAST': 'Breast', 'BREASTSTROKE': 'Breast', 'BR': 'Breast',
+    'FLY': 'Fly', 'BUTTERFLY': 'Fly', 'FL': 'Fly',
+    'IM': 'IM', 'I.M.': 'IM', 'INDIVIDUAL': 'IM', 'INDIVIDUAL MEDLEY': 'IM', 'MEDLEY': 'IM',
+}
+
+EVENT_PATTERN = re.compile(r'^\s*(\d+)\s+(\S+)\s+(.+?)\s*$')
+
+
+class Event(NamedTuple):
+    """A single individual event, e.g. Event(100, 'Y', 'Free')"""
+    distance: int
+    course: str
+    stroke: str
+
+    @property
+    def name(self):
+        return f"{self.distance} {self.course} {self.stroke}"
+
+    @property
+    def course_code(self):
+        return COURSE_CODES[self.course]
+
+    def sort_key(self):
+        return (COURSES.index(self.course), STROKES.index(self.stroke), self.distance)
+
+
+# Every distinct Event is created once and shared by every swimmer that swims it
+_events = {}
+# Raw event strings seen so far -> interned Event (or None when not a timed swim)
+_parsed = {}
+
+
+def intern_event(distance, course, stroke):
+    """Return the shared Event instance for a distance/course/stroke"""
+    key = (distance, course, stroke)
+    event = _events.get(key)
+    if event is None:
+        event = _events.setdefault(key, Event(*key))
+    return event
+
+
+def parse_event(raw):
+    """Parse a raw event name ("100 Y Free", "100 Yards FREESTYLE") into an interned Event
+
+    Returns None for anything that isn't a timed individual swim (diving, relays, ...).
+    """
+    if not isinstance(raw, str):
+        return None
+    try:
+        return _parsed[raw]
+    except KeyError:
+        pass
+
+    event = None
+    match = EVENT_PATTERN.match(raw)
+    if match:
+        distance, course, stroke = match.groups()
+        course = COURSE_ALIASES.get(course.upper())
+        stroke = STROKE_ALIASES.get(stroke.upper())
+        if course and stroke:
+            event = intern_event(int(distance), course, stroke)
+
+    _parsed[raw] = event
+    return event
+
+
+def canonical_event_name(raw):
+    """Canonical display name for an event, falling back to the stripped raw name"""
+    event = parse_event(raw)
+    if event is None:
+        return raw.strip() if isinstance(raw, str) else raw
+    return event.name
+
+
+def add_best_time(best_times, event_name, time, seconds):
+    """Record a time under its canonical event name, keeping the faster of any duplicates"""
+    name = canonical_event_name(event_name)
+    current = best_times.get(name)
+    if current is None or seconds < current['seconds']:
+        best_times[name] = {
+            'time': time,
+            'seconds': seconds
+        }
+
+
+class BestTimesMatrix:
+    """Swimmers x events matrix of best times in seconds (float32, NaN when missing)"""
+
+    def __init__(self, ids, events, seconds):
+        self.ids = list(ids)
+        self.events = list(events)
+        self.seconds = seconds
+        self.id_index = {swimmer_id: i for i, swimmer_id in enumerate(self.ids)}
+        self.event_index = {event: j for j, event in enumerate(self.events)}
+
+    @classmethod
+    def from_swimmers(cls, swimmers):
+        """Build the matrix from a swimmers dict shaped like public/swimmers.json"""
+        def event_seconds(best_times):
+            for event_name, data in (best_times or {}).items():
+                yield event_name, data.get('seconds') if isinstance(data, dict) else None
+
+        return cls.from_event_seconds(
+            (swimmer_id, event_seconds(swimmer.get('best_times'))) for swimmer_id, swimmer in swimmers.items()
+        )
+
+    @classmethod
+    def from_records(cls, records):
+        """Build the matrix from SwimmerRecord objects"""
+        return cls.from_event_seconds((record.id, record.event_seconds()) for record in records)
+
+    @classmethod
+    def from_event_seconds(cls, swimmers):
+        """Build the matrix from (swimmer_id, [(event_name, seconds), ...]) pairs"""
+        import numpy as np
+
+        ids = []
+        rows = []
+        seen = set()
+        for swimmer_id, event_seconds in swimmers:
+            row = {}
+            for event_name, seconds in event_seconds:
+                event = parse_event(event_name)
+                if event is None or not seconds:
+                    continue
+                if event not in row or seconds < row[event]:
+                    row[event] = seconds
+            seen.update(row)
+            ids.append(swimmer_id)
+            rows.append(row)
+
+        events = sorted(seen, key=Event.sort_key)
+        event_index = {event: j for j, event in enumerate(events)}
+        seconds = np.full((len(ids), len(events)), np.nan, dtype=np.float32)
+        for i, row in enumerate(rows):
+            for event, value in row.items():
+                seconds[i, event_index[event]] = value
+
+        return cls(ids, events, seconds)
+
+    def column(self, event):
+        """All swimmers' times for one event (Event or raw name)"""
+        import numpy as np
+
+        if not isinstance(event, Event):
+            event = parse_event(event)
+        j = self.event_index.get(event)
+        if j is None:
+            return np.full(len(self.ids), np.nan, dtype=np.float32)
+        return self.seconds[:, j]
+
+    def row(self, swimmer_id):
+        """One swimmer's times across every event column"""
+        return self.seconds[self.id_index[str(swimmer_id)]]
+
+    def best_time(self, swimmer_id, event):
+        """A single swimmer's best time for an event, or None"""
+        import numpy as np
+
+        i = self.id_index.get(str(swimmer_id))
+        if not isinstance(event, Event):
+            event = parse_event(event)
+        j = self.event_index.get(event)
+        if i is None or j is None or np.isnan(self.seconds[i, j]):
+            return None
+        return float(self.seconds[i, j])
@@ -0,0 +1,315 @@
+"""Glicko-2 rating engine over the vote log, as an alternative to fixed-K ELO
+
+Every swimmer carries a rating, a rating deviation (RD, how unsure we are)
+and a volatility. Votes are grouped into rating periods and each period is
+one vectorized NumPy update over every swimmer at once (Glickman, "Example
+of the Glicko-2 system"). New swimmers start with a large RD and move fast;
+well-established ones barely move, so far fewer votes are needed before the
+leaderboard settles than with eloCalculator's step-function K.
+
+Ratings are exported to swimmer_ratings as ``elo`` (the Glicko rating, on
+the same 1500-centred scale) and ``ratings_count``; RD and volatility are
+kept in a local state file between runs. A swimmer seen for the first time
+starts from their swimmer_ratings row: ``elo`` is their rating, their RD is
+the one ``ratings_count`` evenly matched games would leave (see
+rd_for_count), and new votes add to that count.
+
+That row already reflects every vote vote_ingest's worker has applied, i.e.
+every vote before its checkpoint offset in the log. Each swimmer keeps the
+log offset their starting row covered, and a vote only counts for a swimmer
+if it was logged at or after it, so no vote is counted twice.
+
+Only closed rating periods are applied. The state records the start of the
+first open period, and the next run picks its votes up from the log once
+the period has ended.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+import db
+from vote_ingest import VoteLog
+
+SCALE = 173.7178          # Glicko-2 <-> Glicko rating scale
+DEFAULT_RATING = 1500.0
+DEFAULT_RD = 350.0
+MIN_RD = 30.0             # Floor for RDs derived from a vote count
+DEFAULT_VOLATILITY = 0.06
+TAU = 0.5                 # Constrains volatility change per period
+EPSILON = 1e-6
+MAX_ITERATIONS = 100
+PERIOD_SECONDS = 24 * 3600
+STATE_PATH = 'votes/glicko_state.json'
+
+
+def rd_for_count(count):
+    """RD left after `count` games against evenly matched opponents, starting from DEFAULT_RD
+
+    Each such game adds about 1/4 to 1/phi^2 (g ~ 1, E = 0.5).
+    """
+    phi = 1.0 / np.sqrt((SCALE / DEFAULT_RD) ** 2 + np.maximum(count, 0) / 4.0)
+    return np.maximum(SCALE * phi, MIN_RD)
+
+
+class GlickoRatings:
+    """Rating, RD, volatility and vote count for every swimmer, stored as arrays"""
+
+    def __init__(self, ids, rating=None, rd=None, volatility=None, count=None, start=None):
+        n = len(ids)
+        self.ids = list(ids)
+        self.index = {swimmer_id: i for i, swimmer_id in enumerate(self.ids)}
+        self.rating = np.full(n, DEFAULT_RATING) if rating is None else np.asarray(rating, dtype=float)
+        self.rd = np.full(n, DEFAULT_RD) if rd is None else np.asarray(rd, dtype=float)
+        self.volatility = np.full(n, DEFAULT_VOLATILITY) if volatility is None else np.asarray(volatility, dtype=float)
+        self.count = np.zeros(n, dtype=np.int64) if count is None else np.asarray(count, dtype=np.int64)
+        # Vote log offset each swimmer's starting rating already reflects
+        self.start = np.zeros(n, dtype=np.int64) if start is None else np.asarray(start, dtype=np.int64)
+
+    def add(self, swimmer_id, rating=DEFAULT_RATING, count=0, start=0):
+        """Start tracking a swimmer at `rating` with `count` earlier votes (no-op if already tracked)
+
+        `start` is the vote log offset those votes run up to; earlier votes
+        are not counted for this swimmer again.
+        """
+        if swimmer_id in self.index:
+            return self.index[swimmer_id]
+        self.index[swimmer_id] = len(self.ids)
+        self.ids.append(swimmer_id)
+        self.rating = np.append(self.rating, rating)
+        self.rd = np.append(self.rd, rd_for_count(count))
+        self.volatility = np.append(self.volatility, DEFAULT_VOLATILITY)
+        self.count = np.append(self.count, count)
+        self.start = np.append(self.start, start)
+        return self.index[swimmer_id]
+
+    def update(self, winners, losers, winner_counts=None, loser_counts=None):
+        """Apply one rating period of games given as parallel arrays of swimmer rows
+
+        winner_counts/loser_counts mask the games that count for each side
+        (by default every game counts once from each side).
+        """
+        winners = np.asarray(winners, dtype=np.int64)
+        losers = np.asarray(losers, dtype=np.int64)
+        winner_counts = np.ones(len(winners), dtype=bool) if winner_counts is None else np.asarray(winner_counts)
+        loser_counts = np.ones(len(losers), dtype=bool) if loser_counts is None else np.asarray(loser_counts)
+        n = len(self.ids)
+
+        mu = (self.rating - DEFAULT_RATING) / SCALE
+        phi = self.rd / SCALE
+        sigma = self.volatility
+
+        players = np.concatenate([winners[winner_counts], losers[loser_counts]])
+        opponents = np.concatenate([losers[winner_counts], winners[loser_counts]])
+        scores = np.concatenate([np.ones(winner_counts.sum()), np.zeros(loser_counts.sum())])
+
+        g = 1.0 / np.sqrt(1.0 + 3.0 * phi[opponents] ** 2 / np.pi ** 2)
+        expected = 1.0 / (1.0 + np.exp(-g * (mu[players] - mu[opponents])))
+
+        played = np.bincount(players, minlength=n) > 0
+        v_inv = np.bincount(players, weights=g ** 2 * expected * (1 - expected), minlength=n)
+        improvement = np.bincount(players, weights=g * (scores - expected), minlength=n)
+
+        new_phi = np.sqrt(phi ** 2 + sigma ** 2)  # Swimmers without games only gain uncertainty
+        new_mu = mu.copy()
+        new_sigma = sigma.copy()
+
+        if played.any():
+            p = played
+            v = 1.0 / v_inv[p]
+            delta = v * improvement[p]
+            sigma_p = self._new_volatility(phi[p], sigma[p], v, delta)
+            phi_star = np.sqrt(phi[p] ** 2 + sigma_p ** 2)
+            new_phi[p] = 1.0 / np.sqrt(1.0 / phi_star ** 2 + 1.0 / v)
+            new_mu[p] = mu[p] + new_phi[p] ** 2 * improvement[p]
+            new_sigma[p] = sigma_p
+
+        self.rating = DEFAULT_RATING + SCALE * new_mu
+        self.rd = np.minimum(SCALE * new_phi, DEFAULT_RD)
+        self.volatility = new_sigma
+        self.count += np.bincount(players, minlength=n)
+
+    @staticmethod
+    def _new_volatility(phi, sigma, v, delta):
+        """Vectorized Illinois-method solve for each player's new volatility"""
+        a = np.log(sigma ** 2)
+
+        def f(x):
+            ex = np.exp(x)
+            return (ex * (delta ** 2 - phi ** 2 - v - ex) / (2 * (phi ** 2 + v + ex) ** 2)
+                    - (x - a) / TAU ** 2)
+
+        big = delta ** 2 > phi ** 2 + v
+        A = a.copy()
+        B = np.where(big, np.log(np.maximum(delta ** 2 - phi ** 2 - v, 1e-300)), a - TAU)
+        # For the other case step B down until f(B) >= 0
+        for _ in range(MAX_ITERATIONS):
+            low = ~big & (f(B) < 0)
+            if not low.any():
+                break
+            B = np.where(low, B - TAU, B)
+
+        fA, fB = f(A), f(B)
+        for _ in range(MAX_ITERATIONS):
+            active = np.abs(B - A) > EPSILON
+            if not active.any():
+                break
+            C = A + (A - B) * fA / (fB - fA)
+            fC = f(C)
+            flip = active & (fC * fB <= 0)
+            halve = active & ~flip
+            A = np.where(flip, B, A)
+            fA = np.where(flip, fB, np.where(halve, fA / 2, fA))
+            B = np.where(active, C, B)
+            fB = np.where(active, fC, fB)
+
+        return np.exp(A / 2)
+
+    def to_state(self):
+        return {
+            swimmer_id: [float(self.rating[i]), float(self.rd[i]), float(self.volatility[i]), int(self.count[i]),
+                         int(self.start[i])]
+            for i, swimmer_id in enumerate(self.ids)
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        ids = list(state)
+        # States saved before start offsets were tracked have four columns
+        rows = [list(row) + [0] * (5 - len(row)) for row in state.values()]
+        columns = list(zip(*rows)) if rows else [[], [], [], [], []]
+        return cls(ids, *columns)
+
+    def to_rating_rows(self):
+        """swimmer_ratings columns for every tracked swimmer"""
+        return [
+            {'id': swimmer_id, 'elo': round(float(self.rating[i]), 2), 'ratings_count': int(self.count[i])}
+            for i, swimmer_id in enumerate(self.ids)
+        ]
+
+
+def load_state(path=STATE_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_state(ratings, applied_until, path=STATE_PATH):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'applied_until': applied_until, 'ratings': ratings.to_state()}, f)
+    os.replace(tmp_path, path)
+
+
+def read_vote_log(path):
+    """Votes from vote_ingest's log as (timestamp, winner_id, loser_id, byte offset of the line)"""
+    votes = []
+    offset = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            if line.endswith(b'\n'):  # A partially written last line is picked up next run
+                try:
+                    vote = json.loads(line)
+                    votes.append((vote['ts'], str(vote['winner_id']), str(vote['loser_id']), offset))
+                except (ValueError, KeyError, TypeError):
+                    pass
+            offset += len(line)
+    return votes
+
+
+def rate_votes(ratings, votes, period_seconds=PERIOD_SECONDS, since=0, now=None, current=None, reflected=0):
+    """Apply the votes of every closed rating period from `since` on, one Glicko-2 update per period
+
+    `current` maps swimmer IDs to their swimmer_ratings rows, used as the
+    starting point for swimmers not tracked yet; those rows reflect every vote
+    logged before offset `reflected`. Returns the start of the first open
+    period, the `since` for the next run.
+    """
+    current = current or {}
+    open_period = int((time.time() if now is None else now) // period_seconds)
+    votes = sorted((v for v in votes if v[0] >= since and int(v[0] // period_seconds) < open_period),
+                   key=lambda v: v[3])
+
+    def track(swimmer_id):
+        row = current.get(swimmer_id)
+        if row is None:
+            return ratings.add(swimmer_id)
+        return ratings.add(swimmer_id, row['elo'], row['ratings_count'] or 0, reflected)
+
+    periods = {}
+    rated = 0
+    for ts, winner_id, loser_id, offset in votes:
+        if winner_id == loser_id:
+            continue
+        winner, loser = track(winner_id), track(loser_id)
+        counts = (offset >= ratings.start[winner], offset >= ratings.start[loser])
+        if any(counts):
+            periods.setdefault(int(ts // period_seconds), []).append((winner, loser, *counts))
+            rated += 1
+
+    for period in sorted(periods):
+        ratings.update(*zip(*periods[period]))
+    print(f"Rated {rated} votes over {len(periods)} closed rating periods"
+          + (f" ({len(votes) - rated} already in the starting ratings)" if rated < len(votes) else ""))
+    return max(since, open_period * period_seconds)
+
+
+def fetch_current(log, wait_seconds=1.0):
+    """(swimmer_ratings rows by ID, log offset those rows reflect)
+
+    Read between two looks at the vote worker's checkpoint, retrying while a
+    batch is in flight, so the offset matches exactly the votes in the rows.
+    """
+    while True:
+        before = log.applied_offset()
+        if log.read_pending_batch() is None:
+            rows = {row['id']: row for row in db.fetch_ratings('id, name, team, elo, ratings_count')}
+            if log.read_pending_batch() is None and log.applied_offset() == before:
+                return rows, before
+        time.sleep(wait_seconds)
+
+
+def push_ratings(ratings, current, batch_size=500):
+    """Upsert Glicko ratings into swimmer_ratings (existing rows only)"""
+    rows = [{**current[row['id']], **row} for row in ratings.to_rating_rows() if row['id'] in current]
+    for i in range(0, len(rows), batch_size):
+        db.get_supabase().table('swimmer_ratings').upsert(rows[i:i + batch_size]).execute()
+    print(f"Updated {len(rows)} swimmer ratings")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Glicko-2 batch rating over the vote log')
+    parser.add_argument('--votes', default='votes/votes.log', help='Vote log written by vote_ingest.py')
+    parser.add_argument('--state', default=STATE_PATH, help='Where RD/volatility are kept between runs')
+    parser.add_argument('--period-hours', type=float, default=PERIOD_SECONDS / 3600, help='Rating period length')
+    parser.add_argument('--push', action='store_true', help='Write the ratings to Supabase')
+    args = parser.parse_args()
+
+    state = load_state(args.state)
+    if state:
+        ratings = GlickoRatings.from_state(state['ratings'])
+        since = state['applied_until']
+    else:
+        ratings = GlickoRatings([])
+        since = 0
+
+    reflected = 0
+    if db.has_credentials():
+        current, reflected = fetch_current(VoteLog(args.votes))
+    elif args.push:
+        parser.error('--push needs SUPABASE_URL and SUPABASE_KEY')
+    else:
+        print("Supabase not configured: new swimmers start at the default rating")
+        current = {}
+
+    applied_until = rate_votes(ratings, read_vote_log(args.votes), args.period_hours * 3600, since,
+                               current=current, reflected=reflected)
+    save_state(ratings, applied_until, args.state)
+
+    if args.push:
+        push_ratings(ratings, current)
@@ -0,0 +1,209 @@
+"""Mirror swimmer profile images locally, content-addressed, with small thumbnails
+
+Originals are stored once under their SHA-256 (public/images/<hash>.<ext>) and
+thumbnails are written next to them (<hash>.<size>.webp / .avif). A manifest
+maps each remote URL to its hash and the ETag/Last-Modified it was served
+with. Re-runs skip images they already have, and after REVALIDATE_SECONDS
+send a conditional request so an image replaced at the same URL is refreshed.
+Thumbnailing needs Pillow (pip install pillow).
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import requests
+from tqdm import tqdm
+
+IMAGE_DIR = 'public/images'
+PUBLIC_DIR = 'public'
+MANIFEST_NAME = 'manifest.json'
+THUMBNAIL_SIZE = 160
+DOWNLOAD_WORKERS = 16
+REVALIDATE_SECONDS = 7 * 24 * 3600   # How long a cached image is trusted before asking the server again
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+}
+EXTENSIONS = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/gif': '.gif',
+    'image/webp': '.webp',
+}
+
+
+def load_manifest(image_dir=IMAGE_DIR):
+    try:
+        with open(os.path.join(image_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(manifest, image_dir=IMAGE_DIR):
+    """Write the manifest atomically so an interrupted run never leaves it half-written"""
+    path = os.path.join(image_dir, MANIFEST_NAME)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def download_image(session, url, image_dir=IMAGE_DIR, entry=None):
+    """Fetch one image and store it under its content hash
+
+    Returns (hash, original path, validators), or None when `entry` (the
+    cached manifest entry) is still current and the server answered 304.
+    """
+    headers = {}
+    if entry:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+    response = session.get(url, timeout=15, headers=headers)
+    if entry and response.status_code == 304:
+        return None
+    response.raise_for_status()
+    content = response.content
+    digest = hashlib.sha256(content).hexdigest()
+    content_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+    extension = EXTENSIONS.get(content_type) or os.path.splitext(url.split('?')[0])[1] or '.jpg'
+
+    path = os.path.join(image_dir, digest + extension)
+    if not os.path.exists(path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    validators = {'etag': response.headers.get('ETag'), 'last_modified': response.headers.get('Last-Modified')}
+    return digest, path, validators
+
+
+def make_thumbnails(source_path, digest, image_dir=IMAGE_DIR, size=THUMBNAIL_SIZE):
+    """Square-cropped WebP (and AVIF where Pillow supports it) thumbnails; runs in a worker process"""
+    from PIL import Image, ImageOps, features
+
+    formats = [('webp', 'WEBP', {'quality': 80, 'method': 6})]
+    if features.check('avif'):
+        formats.append(('avif', 'AVIF', {'quality': 60}))
+
+    thumbnails = {}
+    with Image.open(source_path) as image:
+        thumbnail = ImageOps.fit(ImageOps.exif_transpose(image).convert('RGB'), (size, size))
+        for extension, pil_format, options in formats:
+            path = os.path.join(image_dir, f"{digest}.{size}.{extension}")
+            if not os.path.exists(path):
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                thumbnail.save(tmp_path, pil_format, **options)
+                os.replace(tmp_path, path)
+            thumbnails[extension] = path
+    return digest, thumbnails
+
+
+def public_path(path, public_dir=PUBLIC_DIR):
+    """Filesystem path under public/ -> URL path the app serves it from"""
+    return '/' + os.path.relpath(path, public_dir).replace(os.sep, '/')
+
+
+def mirror_images(urls, image_dir=IMAGE_DIR, workers=DOWNLOAD_WORKERS):
+    """Download new URLs and thumbnail new content; returns {url: local thumbnail URL path}"""
+    os.makedirs(image_dir, exist_ok=True)
+    manifest = load_manifest(image_dir)
+
+    def is_cached(url):
+        entry = manifest.get(url)
+        return entry and all(
+            os.path.exists(os.path.join(image_dir, os.path.basename(p))) for p in entry['thumbnails'].values()
+        )
+
+    now = time.time()
+    wanted = {url for url in urls if url and url.startswith('http')}
+    to_fetch = sorted(url for url in wanted if not is_cached(url))
+    to_revalidate = sorted(
+        url for url in wanted
+        if is_cached(url) and now - manifest[url].get('checked_at', 0) >= REVALIDATE_SECONDS
+    )
+    print(f"Mirroring {len(to_fetch)} new profile images, revalidating {len(to_revalidate)} "
+          f"({len(manifest)} already cached)")
+
+    downloaded = {}
+    with requests.Session() as session, ThreadPoolExecutor(max_workers=workers) as executor:
+        session.headers.update(HEADERS)
+        futures = {executor.submit(download_image, session, url, image_dir): url for url in to_fetch}
+        futures.update({
+            executor.submit(download_image, session, url, image_dir, manifest[url]): url for url in to_revalidate
+        })
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Downloading images"):
+            url = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Error downloading {url}: {e}")
+                continue
+            if result is None:
+                manifest[url]['checked_at'] = now  # Not modified
+            else:
+                downloaded[url] = result
+
+    # Several URLs can resolve to the same bytes; thumbnail each distinct image once
+    sources = {digest: path for digest, path, _ in downloaded.values()}
+    thumbnails = {}
+    with ProcessPoolExecutor() as executor:
+        futures = [executor.submit(make_thumbnails, path, digest, image_dir) for digest, path in sources.items()]
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Making thumbnails"):
+            try:
+                digest, paths = future.result()
+                thumbnails[digest] = {fmt: public_path(p) for fmt, p in paths.items()}
+            except Exception as e:
+                print(f"Error making thumbnail: {e}")
+
+    for url, (digest, path, validators) in downloaded.items():
+        if digest in thumbnails:
+            manifest[url] = {
+                'hash': digest,
+                'original': public_path(path),
+                'thumbnails': thumbnails[digest],
+                'checked_at': now,
+                **{key: value for key, value in validators.items() if value}
+            }
+    save_manifest(manifest, image_dir)
+
+    return {url: entry['thumbnails']['webp'] for url, entry in manifest.items()}
+
+
+def mirror_profile_images(records, image_dir=IMAGE_DIR):
+    """Point each SwimmerRecord's profile_image at its local thumbnail where one exists"""
+    records = list(records)
+    local = mirror_images([record.profile_image for record in records], image_dir)
+    rewritten = 0
+    for record in records:
+        if record.profile_image in local:
+            record.profile_image = local[record.profile_image]
+            rewritten += 1
+    print(f"Using local thumbnails for {rewritten}/{len(records)} swimmers")
+
+
+if __name__ == "__main__":
+    from publish import publish_swimmers
+    from records import SwimmerRecord
+
+    parser = argparse.ArgumentParser(description='Mirror profile images referenced by swimmers.json')
+    parser.add_argument('--input', default='public/swimmers.json', help='Converted swimmers JSON')
+    parser.add_argument('--rewrite', action='store_true',
+                        help='Republish swimmers.json (new version and patch) with local profile_image paths')
+    parser.add_argument('--public-dir', default=PUBLIC_DIR, help='Where --rewrite publishes swimmers.json')
+    args = parser.parse_args()
+
+    with open(args.input) as f:
+        swimmers = json.load(f)
+
+    if args.rewrite:
+        records = {swimmer_id: SwimmerRecord.from_json({**swimmer, 'id': swimmer_id})
+                   for swimmer_id, swimmer in swimmers.items()}
+        mirror_profile_images(records.values())
+        publish_swimmers(records, args.public_dir)
+    else:
+        mirror_images([swimmer.get('profile_image') for swimmer in swimmers.values()])
@@ -0,0 +1,213 @@
+"""Head-to-head pair selection for the voting flow, served from precomputed pools"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+import db
+from events import BestTimesMatrix
+from points import points_matrix
+
+ELO_BAND = 100          # Width of an ELO bucket
+POOL_SIZE = 2000        # Pairs drawn into each specialty pool per refresh
+REFRESH_SECONDS = 300   # How often the server rebuilds its pools
+MAX_COUNT = 50          # Pairs returned per /pairs request at most
+DIVING_WORDS = ('DIVING', 'DIVE', 'PLATFORM', 'SPRINGBOARD')
+
+# Fields sent to the client for each side of a pair
+PAIR_FIELDS = ('id', 'name', 'team', 'elo', 'ratings_count', 'best_times',
+               'profile_image', 'initials', 'twitter', 'instagram')
+
+
+def is_diver(swimmer):
+    """Same rule as isDiver in App.js: no events, or mostly diving events"""
+    events = list((swimmer.get('best_times') or {}).keys())
+    if not events:
+        return True
+    diving = [e for e in events if any(word in e.upper() for word in DIVING_WORDS)]
+    return len(diving) / len(events) > 0.5
+
+
+def load_swimmers(path='public/swimmers.json', live_ratings=True):
+    """Converted swimmers with ELO/ratings_count overlaid from Supabase when available"""
+    with open(path) as f:
+        swimmers = json.load(f)
+
+    if live_ratings and db.has_credentials():
+        for row in db.fetch_ratings():
+            swimmer = swimmers.get(row['id'])
+            if swimmer:
+                swimmer['elo'] = row['elo']
+                swimmer['ratings_count'] = row['ratings_count']
+
+    return {sid: s for sid, s in swimmers.items() if not is_diver(s)}
+
+
+class MatchupPools:
+    """Pairs bucketed by event specialty and ELO band, weighted towards informative votes
+
+    A vote is most informative when the two swimmers are closely rated (the
+    outcome is uncertain) and at least one of them has few ratings. Pools are
+    sampled with those weights when built, so drawing a pair is a single
+    uniform index into a precomputed array.
+    """
+
+    def __init__(self, swimmers, pool_size=POOL_SIZE, seed=None):
+        rng = np.random.default_rng(seed)
+        self.swimmers = swimmers
+        self.ids = list(swimmers.keys())
+        self.built_at = time.time()
+
+        elo = np.array([float(swimmers[sid].get('elo') or 1500) for sid in self.ids])
+        counts = np.array([int(swimmers[sid].get('ratings_count') or 0) for sid in self.ids])
+        specialties = self._specialties(swimmers)
+        bands = np.floor(elo / ELO_BAND).astype(np.int64)
+
+        # Uncertainty shrinks as a swimmer collects ratings
+        uncertainty = 1.0 / np.sqrt(1.0 + counts)
+
+        # (specialty, band) -> member rows
+        buckets = {}
+        for i, key in enumerate(zip(specialties, bands)):
+            buckets.setdefault(key, []).append(i)
+        buckets = {key: np.array(rows) for key, rows in buckets.items()}
+
+        self.pools = {}
+        for specialty in sorted(set(specialties)):
+            pairs = self._draw_pairs(rng, specialty, buckets, elo, uncertainty, pool_size)
+            if len(pairs):
+                self.pools[specialty] = pairs
+        self.specialties = list(self.pools.keys())
+
+    def _specialties(self, swimmers):
+        """Stroke of each swimmer's highest-scoring event"""
+        matrix = BestTimesMatrix.from_swimmers(swimmers)
+        points = points_matrix(matrix)
+        strokes = np.array([event.stroke for event in matrix.events] or ['Other'])
+        best = np.argmax(points, axis=1) if points.shape[1] else np.zeros(len(self.ids), dtype=int)
+        scored = points.max(axis=1) > 0 if points.shape[1] else np.zeros(len(self.ids), dtype=bool)
+        return np.where(scored, strokes[best], 'Other').tolist()
+
+    def _draw_pairs(self, rng, specialty, buckets, elo, uncertainty, pool_size):
+        """Sample pairs within a specialty from the same or an adjacent ELO band"""
+        keys = [key for key in buckets if key[0] == specialty]
+        members = np.concatenate([buckets[key] for key in keys])
+        if len(members) < 2:
+            return np.empty((0, 2), dtype=np.int32)
+
+        # Neighbourhood of each band: itself plus the bands either side
+        neighbours = {}
+        for _, band in keys:
+            rows = [buckets[(specialty, b)] for b in (band - 1, band, band + 1) if (specialty, b) in buckets]
+            neighbours[band] = np.concatenate(rows)
+
+        weights = uncertainty[members] / uncertainty[members].sum()
+        firsts = rng.choice(members, size=pool_size, p=weights)
+        pairs = []
+        for first in firsts:
+            candidates = neighbours[int(np.floor(elo[first] / ELO_BAND))]
+            candidates = candidates[candidates != first]
+            if not len(candidates):
+                continue
+            # Expected-score closeness times the partner's uncertainty
+            expected = 1.0 / (1.0 + 10 ** ((elo[candidates] - elo[first]) / 400))
+            w = expected * (1.0 - expected) * uncertainty[candidates]
+            second = rng.choice(candidates, p=w / w.sum())
+            pairs.append((first, second))
+        return np.array(pairs, dtype=np.int32).reshape(-1, 2)
+
+    def sample(self, specialty=None):
+        """Draw one pair of swimmer dicts in O(1), or None when there are no pairs at all"""
+        if not self.pools:
+            return None
+        if specialty not in self.pools:
+            specialty = random.choice(self.specialties)
+        pool = self.pools[specialty]
+        first, second = pool[random.randrange(len(pool))]
+        if random.random() < 0.5:
+            first, second = second, first
+        return [self._public(first), self._public(second)]
+
+    def _public(self, row):
+        swimmer = self.swimmers[self.ids[row]]
+        return {field: swimmer.get(field) for field in PAIR_FIELDS}
+
+
+class PairServer:
+    """Keeps a MatchupPools instance fresh and serves pairs over HTTP"""
+
+    def __init__(self, path='public/swimmers.json', refresh_seconds=REFRESH_SECONDS, live_ratings=True):
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        self.live_ratings = live_ratings
+        self.pools = None
+        self.refresh()
+
+    def refresh(self):
+        """Rebuild the pools and swap them in; requests keep using the old ones meanwhile"""
+        start = time.time()
+        swimmers = load_swimmers(self.path, self.live_ratings)
+        self.pools = MatchupPools(swimmers)
+        print(f"Built {sum(len(p) for p in self.pools.pools.values())} pairs for "
+              f"{len(swimmers)} swimmers in {time.time() - start:.2f}s")
+
+    def _refresh_loop(self):
+        while True:
+            time.sleep(self.refresh_seconds)
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error refreshing pair pools: {e}")
+
+    def serve(self, host='127.0.0.1', port=8787):
+        server_state = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path != '/pairs':
+                    self.send_error(404)
+                    return
+                query = parse_qs(url.query)
+                try:
+                    count = max(1, min(int(query.get('count', ['1'])[0]), MAX_COUNT))
+                except ValueError:
+                    self.send_error(400, 'count must be an integer')
+                    return
+                specialty = query.get('specialty', [None])[0]
+                pools = server_state.pools
+                if pools is None or not pools.pools:
+                    self.send_error(503, 'No swimmer pairs available')
+                    return
+                body = json.dumps([pools.sample(specialty) for _ in range(count)]).encode()
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        threading.Thread(target=self._refresh_loop, daemon=True).start()
+        print(f"Serving pairs on http://{host}:{port}/pairs")
+        ThreadingHTTPServer((host, port), Handler).serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Serve head-to-head voting pairs')
+    parser.add_argument('--input', default='public/swimmers.json', help='Converted swimmers JSON')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--refresh', type=int, default=REFRESH_SECONDS, help='Seconds between pool rebuilds')
+    parser.add_argument('--offline', action='store_true', help="Don't overlay live ratings from Supabase")
+    args = parser.parse_args()
+
+    PairServer(args.input, args.refresh, live_ratings=not args.offline).serve(args.host, args.port)
@@ -0,0 +1,92 @@
+"""Vectorized port of src/utils/pointsCalculator.js over a BestTimesMatrix
+
+swimmer_score() is the same calculation for one swimmer in plain Python, so
+single adds can seed a rating without NumPy.
+"""
+from events import parse_event
+
+# World records in seconds, keyed the same way as pointsCalculator.js
+WORLD_RECORDS = {
+    'SCY': {
+        'Free': {50: 17.63, 100: 39.90, 200: 88.81, 500: 244.45, 1000: 513.93, 1650: 852.08},
+        'Back': {50: 20.35, 100: 43.35, 200: 95.37},
+        'Breast': {50: 22.40, 100: 49.53, 200: 107.91},
+        'Fly': {50: 20.00, 100: 42.80, 200: 97.35},
+        'IM': {200: 97.91, 400: 213.42},
+    },
+    'SCM': {
+        'Free': {50: 19.90, 100: 44.84, 200: 98.61, 400: 212.25, 800: 440.46, 1500: 846.88},
+        'Back': {50: 22.11, 100: 48.33, 200: 105.63},
+        'Breast': {50: 24.95, 100: 55.28, 200: 120.16},
+        'Fly': {50: 21.32, 100: 47.71, 200: 106.85},
+        'IM': {100: 49.28, 200: 108.88, 400: 234.81},
+    },
+    'LCM': {
+        'Free': {50: 20.91, 100: 46.40, 200: 102.00, 400: 220.07, 800: 452.12, 1500: 870.67},
+        'Back': {50: 23.55, 100: 51.60, 200: 111.92},
+        'Breast': {50: 25.95, 100: 56.88, 200: 125.48},
+        'Fly': {50: 22.27, 100: 49.45, 200: 110.34},
+        'IM': {200: 114.00, 400: 242.50},
+    },
+}
+
+# Weights for a swimmer's top 4 scored events (calculateOverallScore)
+OVERALL_WEIGHTS = (0.40, 0.40, 0.15, 0.05)
+
+
+def world_record(event):
+    """World record for an Event in seconds, or None if it isn't a scored event"""
+    return WORLD_RECORDS.get(event.course_code, {}).get(event.stroke, {}).get(event.distance)
+
+
+def world_record_vector(events):
+    """World records aligned with a list of event columns (NaN where unscored)"""
+    import numpy as np
+
+    records = [world_record(event) for event in events]
+    return np.array([np.nan if r is None else r for r in records], dtype=np.float32)
+
+
+def points_matrix(matrix):
+    """Points for every swimmer/event: 1000 * (WR / time)^3, 0 where missing or unscored"""
+    import numpy as np
+
+    records = world_record_vector(matrix.events)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        points = 1000.0 * np.power(records[np.newaxis, :] / matrix.seconds, 3)
+    return np.nan_to_num(np.rint(points), nan=0.0, posinf=0.0).astype(np.float32)
+
+
+def overall_scores(points):
+    """Weighted top-4 score per swimmer (rows of a points matrix), like calculateOverallScore"""
+    import numpy as np
+
+    top = -np.sort(-points, axis=1)[:, :len(OVERALL_WEIGHTS)]
+    if top.shape[1] < len(OVERALL_WEIGHTS):
+        top = np.pad(top, ((0, 0), (0, len(OVERALL_WEIGHTS) - top.shape[1])))
+    weights = np.where(top > 0, OVERALL_WEIGHTS, 0)
+    total_weight = weights.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scores = (top * weights).sum(axis=1) / total_weight
+    return np.rint(np.nan_to_num(scores, nan=0.0)).astype(np.int32)
+
+
+def swimmer_score(best_times):
+    """overall_scores() for a single best_times dict, without building a matrix"""
+    fastest = {}
+    for event_name, data in (best_times or {}).items():
+        event = parse_event(event_name)
+        seconds = data.get('seconds') if isinstance(data, dict) else None
+        if event is not None and seconds and (event not in fastest or seconds < fastest[event]):
+            fastest[event] = seconds
+
+    points = []
+    for event, seconds in fastest.items():
+        record = world_record(event)
+        if record is not None:
+            points.append(round(1000.0 * (record / seconds) ** 3))
+    top = sorted((p for p in points if p > 0), reverse=True)[:len(OVERALL_WEIGHTS)]
+    if not top:
+        return 0
+    weights = OVERALL_WEIGHTS[:len(top)]
+    return round(sum(p * w for p, w in zip(top, weights)) / sum(weights))
@@ -0,0 +1,184 @@
+"""Versioned publishing of swimmers.json with per-version patches
+
+Each conversion publishes a full snapshot named by the hash of its content
+and, when there was a previous version, a patch against it:
+
+    public/swimmers.json                          # latest, as before
+    public/swimmers/manifest.json
+    public/swimmers/swimmers.<version>.json       # latest full snapshot
+    public/swimmers/swimmers.<version>.idx        # "<id> <entry hash>" per line, sorted by ID
+    public/swimmers/patch.<from>.<to>.json        # {"from", "to", "added", "changed", "removed"}
+
+The manifest names the current version and maps every older version still
+covered to the patch that moves it forward one step. A client holding version
+v follows patches[v] until it reaches current; if v isn't in patches (too old,
+or no version yet) it downloads the snapshot instead. Files are written before
+the manifest that points at them, and the manifest is replaced atomically.
+
+Entries are serialized one at a time while the snapshot is written, keeping
+only a short hash per swimmer. The patch is a merge of that hash index with
+the previous version's .idx file, both in sorted ID order, so neither the
+previous snapshot nor a second copy of the new one is ever held in memory;
+only added and changed entries are serialized again for the patch.
+"""
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+
+DELTA_DIR = 'swimmers'
+MAX_PATCHES = 20   # Older patches are pruned; clients that far behind refetch the snapshot
+
+
+def serialize(swimmers):
+    """(swimmer ID, JSON text of its swimmers.json entry) pairs, generated one at a time"""
+    for swimmer_id, record in swimmers.items():
+        yield swimmer_id, json.dumps(record.to_json())
+
+
+def entry_hash(entry):
+    return hashlib.sha256(entry.encode()).hexdigest()[:16]
+
+
+def write_document(entries, path):
+    """Stream serialized entries as one swimmers.json object
+
+    Returns the SHA-256 of the bytes written and {swimmer ID: entry hash}.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    digest = hashlib.sha256()
+    hashes = {}
+    with open(path, 'w') as f:
+        def write(text):
+            f.write(text)
+            digest.update(text.encode())
+
+        write('{')
+        for i, (swimmer_id, entry) in enumerate(entries):
+            if i:
+                write(', ')
+            write(f"{json.dumps(swimmer_id)}: {entry}")
+            hashes[swimmer_id] = entry_hash(entry)
+        write('}')
+    return digest.hexdigest(), hashes
+
+
+def write_index(hashes, path):
+    """Entry hashes as "<id> <hash>" lines in sorted ID order"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        for swimmer_id in sorted(hashes):
+            f.write(f"{swimmer_id} {hashes[swimmer_id]}\n")
+    os.replace(tmp_path, path)
+
+
+def read_index(path):
+    """(swimmer ID, entry hash) pairs from an index file, in its sorted order"""
+    with open(path) as f:
+        for line in f:
+            swimmer_id, digest = line.split()
+            yield swimmer_id, digest
+
+
+def atomic_json(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def load_manifest(delta_dir):
+    try:
+        with open(os.path.join(delta_dir, 'manifest.json')) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def diff(previous, hashes, swimmers):
+    """Patch body from the previous version's index to the new entry hashes
+
+    Walks both in sorted ID order; only added and changed swimmers are serialized.
+    """
+    added, changed, removed = {}, {}, []
+    new_ids = iter(sorted(hashes))
+    new_id = next(new_ids, None)
+    for old_id, old_hash in previous:
+        while new_id is not None and new_id < old_id:
+            added[new_id] = swimmers[new_id].to_json()
+            new_id = next(new_ids, None)
+        if new_id == old_id:
+            if hashes[new_id] != old_hash:
+                changed[new_id] = swimmers[new_id].to_json()
+            new_id = next(new_ids, None)
+        else:
+            removed.append(old_id)
+    while new_id is not None:
+        added[new_id] = swimmers[new_id].to_json()
+        new_id = next(new_ids, None)
+    return {'added': added, 'changed': changed, 'removed': removed}
+
+
+def publish_swimmers(swimmers, public_dir='public'):
+    """Write swimmers.json, its versioned snapshot and index, a patch from the last version and the manifest"""
+    delta_dir = os.path.join(public_dir, DELTA_DIR)
+    os.makedirs(delta_dir, exist_ok=True)
+    latest_path = os.path.join(public_dir, 'swimmers.json')
+
+    tmp_path = os.path.join(delta_dir, 'swimmers.json.tmp')
+    digest, hashes = write_document(serialize(swimmers), tmp_path)
+    version = digest[:16]
+    snapshot_name = f"swimmers.{version}.json"
+    index_name = f"swimmers.{version}.idx"
+
+    manifest = load_manifest(delta_dir) or {}
+    previous_version = manifest.get('current')
+    if previous_version == version and os.path.exists(os.path.join(delta_dir, snapshot_name)):
+        # Same content: the versioned files stand, but swimmers.json may have been rewritten since
+        os.replace(tmp_path, latest_path)
+        print(f"swimmers.json unchanged (version {version})")
+        return version
+
+    os.replace(tmp_path, os.path.join(delta_dir, snapshot_name))
+    write_index(hashes, os.path.join(delta_dir, index_name))
+
+    patches = dict(manifest.get('patches', {}))
+    previous_index = os.path.join(delta_dir, f"swimmers.{previous_version}.idx")
+    if previous_version and os.path.exists(previous_index):
+        patch = {'from': previous_version, 'to': version,
+                 **diff(read_index(previous_index), hashes, swimmers)}
+        patch_name = f"patch.{previous_version}.{version}.json"
+        atomic_json(os.path.join(delta_dir, patch_name), patch)
+        patches[previous_version] = f"{DELTA_DIR}/{patch_name}"
+        print(f"Patch {previous_version} -> {version}: {len(patch['added'])} added, "
+              f"{len(patch['changed'])} changed, {len(patch['removed'])} removed")
+    else:
+        # No index for the previous version: older clients can't be patched forward
+        patches = {}
+
+    # Back at an earlier version: its old forward patch no longer applies
+    patches.pop(version, None)
+    # Oldest patches come first (dicts keep insertion order)
+    for old_version in list(patches)[:-MAX_PATCHES]:
+        patches.pop(old_version)
+
+    atomic_json(os.path.join(delta_dir, 'manifest.json'), {
+        'current': version,
+        'snapshot': f"{DELTA_DIR}/{snapshot_name}",
+        'count': len(hashes),
+        'published_at': datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ'),
+        'patches': patches
+    })
+
+    # Only after the manifest stops pointing at them
+    live = {snapshot_name, index_name, 'manifest.json'} | {os.path.basename(path) for path in patches.values()}
+    for name in os.listdir(delta_dir):
+        if name.endswith(('.json', '.idx')) and name not in live:
+            os.remove(os.path.join(delta_dir, name))
+
+    # Unversioned copy for clients that don't read the manifest
+    shutil.copyfile(os.path.join(delta_dir, snapshot_name), latest_path + '.tmp')
+    os.replace(latest_path + '.tmp', latest_path)
+    print(f"Published swimmers.json version {version} ({len(hashes)} swimmers)")
+    return version
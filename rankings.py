@@ -0,0 +1,178 @@
+"""Per-event leaderboards, ranks and percentiles over the converted best times"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+from events import BestTimesMatrix, Event, parse_event
+
+
+def rank_percentile(rank, n):
+    """Percentile of a rank among n ranked swimmers (see EventRankings.percentile)"""
+    if n <= 1:
+        return 100.0
+    return 100.0 * (n - rank) / (n - 1)
+
+
+class EventRankings:
+    """Sorted per-event indices over a BestTimesMatrix
+
+    Everything is computed once up front so queries are index lookups:
+    ``order[:, j]`` lists swimmer rows fastest-first for event column j and
+    ``ranks[i, j]`` is swimmer i's competition rank (ties share a rank, 0 = no time).
+    """
+
+    def __init__(self, matrix, teams=None):
+        self.matrix = matrix
+        seconds = matrix.seconds
+
+        # NaN sorts last, so the first counts[j] entries of each column are ranked swimmers
+        self.order = np.argsort(seconds, axis=0, kind='stable').astype(np.int32)
+        self.counts = np.sum(~np.isnan(seconds), axis=0).astype(np.int32)
+        self.sorted_seconds = np.take_along_axis(seconds, self.order, axis=0)
+
+        self.ranks = np.zeros(seconds.shape, dtype=np.int32)
+        for j in range(seconds.shape[1]):
+            n = self.counts[j]
+            if n == 0:
+                continue
+            ranked = self.order[:n, j]
+            column = self.sorted_seconds[:n, j]
+            self.ranks[ranked, j] = np.searchsorted(column, column, side='left') + 1
+
+        # Team name -> swimmer row indices
+        self.team_members = {}
+        for i, swimmer_id in enumerate(matrix.ids):
+            team = (teams or {}).get(swimmer_id)
+            if team:
+                self.team_members.setdefault(team, []).append(i)
+        self.team_members = {
+            team: np.array(rows, dtype=np.int32) for team, rows in self.team_members.items()
+        }
+
+    @classmethod
+    def from_swimmers(cls, swimmers):
+        """Build rankings from a swimmers dict shaped like public/swimmers.json"""
+        matrix = BestTimesMatrix.from_swimmers(swimmers)
+        teams = {swimmer_id: swimmer.get('team') for swimmer_id, swimmer in swimmers.items()}
+        return cls(matrix, teams)
+
+    @classmethod
+    def from_records(cls, records):
+        """Build rankings from SwimmerRecord objects"""
+        records = list(records)
+        matrix = BestTimesMatrix.from_records(records)
+        return cls(matrix, {record.id: record.team for record in records})
+
+    def _column(self, event):
+        if not isinstance(event, Event):
+            event = parse_event(event)
+        return self.matrix.event_index.get(event)
+
+    def top_k(self, event, k=10, team=None):
+        """Fastest k swimmers in an event as (swimmer_id, seconds, rank) tuples"""
+        j = self._column(event)
+        if j is None:
+            return []
+
+        if team is None:
+            rows = self.order[:min(k, self.counts[j]), j]
+        else:
+            members = self.team_members.get(team)
+            if members is None:
+                return []
+            member_ranks = self.ranks[members, j]
+            ranked = members[member_ranks > 0]
+            rows = ranked[np.argsort(self.ranks[ranked, j], kind='stable')][:k]
+
+        return [
+            (self.matrix.ids[i], round(float(self.matrix.seconds[i, j]), 2), int(self.ranks[i, j]))
+            for i in rows
+        ]
+
+    def rank(self, swimmer_id, event):
+        """A swimmer's rank in an event (1 = fastest), or None if they have no time"""
+        i = self.matrix.id_index.get(str(swimmer_id))
+        j = self._column(event)
+        if i is None or j is None or self.ranks[i, j] == 0:
+            return None
+        return int(self.ranks[i, j])
+
+    def percentile(self, swimmer_id, event):
+        """Share of the other ranked swimmers in the event that are slower, 0-100
+
+        (n - rank) / (n - 1): the fastest swimmer is 100, the slowest 0, and a
+        swimmer alone in an event is 100.
+        """
+        rank = self.rank(swimmer_id, event)
+        if rank is None:
+            return None
+        return rank_percentile(rank, int(self.counts[self._column(event)]))
+
+    def swimmer_ranks(self, swimmer_id):
+        """Every event a swimmer is ranked in, mapped to (rank, percentile)"""
+        i = self.matrix.id_index.get(str(swimmer_id))
+        if i is None:
+            return {}
+        result = {}
+        for j in np.flatnonzero(self.ranks[i]):
+            rank = int(self.ranks[i, j])
+            n = int(self.counts[j])
+            result[self.matrix.events[j].name] = (rank, round(rank_percentile(rank, n), 1))
+        return result
+
+    def to_json(self):
+        """Static leaderboard payload: per event, ids and times fastest-first with ranks"""
+        events = {}
+        for j, event in enumerate(self.matrix.events):
+            n = int(self.counts[j])
+            rows = self.order[:n, j]
+            events[event.name] = {
+                'ids': [self.matrix.ids[i] for i in rows],
+                'seconds': [round(float(s), 2) for s in self.sorted_seconds[:n, j]],
+                'ranks': self.ranks[rows, j].tolist(),
+            }
+        return events
+
+
+def export_rankings(rankings, output_dir='public'):
+    """Write rankings.json (per-event leaderboards) and swimmer_ranks.json (per-swimmer ranks)"""
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, 'rankings.json'), 'w') as f:
+        json.dump(rankings.to_json(), f, separators=(',', ':'))
+
+    swimmer_ranks = {
+        swimmer_id: rankings.swimmer_ranks(swimmer_id) for swimmer_id in rankings.matrix.ids
+    }
+    with open(os.path.join(output_dir, 'swimmer_ranks.json'), 'w') as f:
+        json.dump(swimmer_ranks, f, separators=(',', ':'))
+
+    print(f"Rankings for {len(rankings.matrix.events)} events saved to {output_dir}/rankings.json")
+    return rankings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Query event leaderboards built from swimmers.json')
+    parser.add_argument('--input', default='public/swimmers.json', help='Converted swimmers JSON')
+    parser.add_argument('--event', help='Event name, e.g. "100 Y Free"')
+    parser.add_argument('--top', type=int, default=10, help='Number of swimmers to list')
+    parser.add_argument('--team', help='Only list swimmers from this team')
+    parser.add_argument('--swimmer', help='Show ranks and percentiles for a swimmer ID')
+    parser.add_argument('--export', action='store_true', help='Write rankings JSON next to the input')
+    args = parser.parse_args()
+
+    with open(args.input) as f:
+        swimmers = json.load(f)
+
+    rankings = EventRankings.from_swimmers(swimmers)
+    if args.export:
+        export_rankings(rankings, os.path.dirname(args.input) or '.')
+
+    if args.event:
+        for swimmer_id, seconds, rank in rankings.top_k(args.event, args.top, args.team):
+            print(f"{rank:>4}. {swimmers[swimmer_id]['name']:<30} {seconds:>8.2f}")
+
+    if args.swimmer:
+        for event, (rank, percentile) in rankings.swimmer_ranks(args.swimmer).items():
+            print(f"{event:<20} #{rank:<5} {percentile:>5.1f}%")
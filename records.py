@@ -0,0 +1,75 @@
+"""Compact swimmer record used by the conversion pipeline"""
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(slots=True)
+class SwimmerRecord:
+    """One swimmer, without a per-instance __dict__
+
+    Best times are kept as a tuple of (event, time, seconds) triples and only
+    expanded into the swimmers.json dict-of-dicts shape when serialized.
+    """
+    id: str
+    name: str
+    team: str
+    best_times: tuple = ()
+    elo: float = 1500
+    ratings_count: int = 0
+    profile_image: Optional[str] = None
+    initials: Optional[str] = None
+    twitter: Optional[str] = None
+    instagram: Optional[str] = None
+
+    @staticmethod
+    def pack_best_times(best_times):
+        """{event: {'time', 'seconds'}} -> ((event, time, seconds), ...)"""
+        return tuple((event, data['time'], data['seconds']) for event, data in best_times.items())
+
+    def best_times_dict(self):
+        return {event: {'time': time, 'seconds': seconds} for event, time, seconds in self.best_times}
+
+    def event_seconds(self):
+        """(event, seconds) pairs for building a BestTimesMatrix"""
+        return ((event, seconds) for event, _, seconds in self.best_times)
+
+    @classmethod
+    def from_json(cls, data):
+        """Inverse of to_json, for records read back from swimmers.json"""
+        return cls(
+            id=str(data['id']),
+            name=data['name'],
+            team=data['team'],
+            best_times=cls.pack_best_times(data.get('best_times') or {}),
+            elo=data.get('elo', 1500),
+            ratings_count=data.get('ratings_count', 0),
+            profile_image=data.get('profile_image'),
+            initials=data.get('initials'),
+            twitter=data.get('twitter'),
+            instagram=data.get('instagram')
+        )
+
+    def to_json(self):
+        """The swimmers.json representation"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'team': self.team,
+            'best_times': self.best_times_dict(),
+            'elo': self.elo,
+            'ratings_count': self.ratings_count,
+            'profile_image': self.profile_image,
+            'initials': self.initials,
+            'twitter': self.twitter,
+            'instagram': self.instagram
+        }
+
+    def to_rating_row(self):
+        """The swimmer_ratings row upserted to Supabase"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'team': self.team,
+            'elo': float(self.elo),
+            'ratings_count': int(self.ratings_count)
+        }
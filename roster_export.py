@@ -0,0 +1,215 @@
+"""Single-writer export of scraped swimmers to per-team Excel rosters
+
+Scraper threads only enqueue results. One writer thread owns every team file:
+it buffers rows per team and flushes them as small JSON-lines chunks under
+output/.staging (temp file + rename, so a crash never leaves a torn chunk).
+When a team is finished its existing workbook and all staged chunks are
+streamed into a new write-only workbook, which atomically replaces the old one.
+"""
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from itertools import chain
+from pathlib import Path
+
+from openpyxl import Workbook, load_workbook
+
+COLUMNS = ["Swimmer ID", "Name", "Current Team", "Teams", "Best Times"]
+STAGING_DIR = os.path.join("output", ".staging")
+FLUSH_COUNT = 25      # Rows buffered per team before a chunk is written
+FLUSH_SECONDS = 5.0   # Oldest buffered row age before a chunk is written
+
+
+def flatten_swimmer(res):
+    """Scraped swimmer dict -> roster row"""
+    teams_str = ", ".join(res["teams"]) if res["teams"] else ""
+    best_times_str = "; ".join([f"{bt['event']}: {bt['time']}"
+                                for bt in res["best_times"]]) if res["best_times"] else ""
+    return {
+        "Swimmer ID": res["swimmer_id"],
+        "Name": res["name"],
+        "Current Team": res["current_team"],
+        "Teams": teams_str,
+        "Best Times": best_times_str
+    }
+
+
+def staging_path(output_file):
+    return os.path.join(STAGING_DIR, Path(output_file).stem)
+
+
+def read_staged_rows(output_file):
+    """Rows flushed for a team but not yet merged into its workbook"""
+    directory = staging_path(output_file)
+    if not os.path.isdir(directory):
+        return
+    for chunk in sorted(f for f in os.listdir(directory) if f.endswith('.jsonl')):
+        with open(os.path.join(directory, chunk)) as f:
+            for line in f:
+                yield json.loads(line)
+
+
+def read_workbook_rows(output_file):
+    """(header, row dicts) of an existing roster workbook, streamed read-only"""
+    if not os.path.exists(output_file):
+        return list(COLUMNS), iter(())
+    workbook = load_workbook(output_file, read_only=True)
+    rows = workbook.active.iter_rows(values_only=True)
+    header = [h for h in next(rows, ()) if h is not None] or list(COLUMNS)
+
+    def row_dicts():
+        try:
+            for values in rows:
+                yield dict(zip(header, values))
+        finally:
+            workbook.close()
+
+    return header, row_dicts()
+
+
+def saved_swimmer_ids(output_file):
+    """Swimmer IDs in a team's workbook plus its staged chunks"""
+    _, rows = read_workbook_rows(output_file)
+    saved = {str(row["Swimmer ID"]) for row in rows if row.get("Swimmer ID") is not None}
+    saved.update(str(row["Swimmer ID"]) for row in read_staged_rows(output_file))
+    return saved
+
+
+def write_chunk(output_file, rows):
+    """Stage rows as a new chunk file, atomically"""
+    directory = staging_path(output_file)
+    os.makedirs(directory, exist_ok=True)
+    chunk_number = sum(1 for f in os.listdir(directory) if f.endswith('.jsonl'))
+    path = os.path.join(directory, f"{chunk_number:06d}.jsonl")
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        for row in rows:
+            f.write(json.dumps(row) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def finalize(output_file):
+    """Merge workbook + staged rows into a fresh write-only workbook and swap it in"""
+    staged = list(read_staged_rows(output_file))
+    if not staged:
+        return 0
+
+    header, existing = read_workbook_rows(output_file)
+    header = header + [c for c in COLUMNS if c not in header]
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(header)
+    seen = set()
+    # Rows arrive in scrape-completion order; sort so re-runs produce the same file
+    for row in sorted(chain(existing, staged), key=lambda r: (len(str(r.get("Swimmer ID"))), str(r.get("Swimmer ID")))):
+        swimmer_id = str(row.get("Swimmer ID"))
+        if swimmer_id in seen:
+            continue
+        seen.add(swimmer_id)
+        sheet.append([row.get(column) for column in header])
+
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    tmp_path = output_file + '.tmp.xlsx'
+    workbook.save(tmp_path)
+    os.replace(tmp_path, output_file)
+    shutil.rmtree(staging_path(output_file), ignore_errors=True)
+    return len(staged)
+
+
+class RosterWriter:
+    """Owns all roster output; other threads talk to it through a queue"""
+
+    def __init__(self, flush_count=FLUSH_COUNT, flush_seconds=FLUSH_SECONDS):
+        self.flush_count = flush_count
+        self.flush_seconds = flush_seconds
+        self.queue = queue.Queue()
+        self.buffers = {}      # output file -> buffered rows
+        self.first_buffered = {}  # output file -> time its oldest buffered row arrived
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def put(self, output_file, result):
+        """Queue one scraped swimmer for a team's roster"""
+        self.queue.put(('row', output_file, flatten_swimmer(result)))
+
+    def flush(self, output_file):
+        """Block until every queued row for a team is staged on disk; raises if it couldn't be"""
+        self._call('flush', output_file)
+
+    def finish(self, output_file):
+        """Block until a team's workbook includes everything queued for it; raises if it couldn't be saved"""
+        return self._call('finish', output_file)
+
+    def close(self):
+        self.queue.put(('stop', None, None))
+        self.thread.join()
+
+    def _call(self, command, output_file):
+        done = threading.Event()
+        reply = {}
+        self.queue.put((command, output_file, (done, reply)))
+        done.wait()
+        if 'error' in reply:
+            raise reply['error']
+        return reply.get('result')
+
+    def _flush(self, output_file):
+        # The buffer is only dropped once its chunk is on disk, so a failed write is retried
+        rows = self.buffers.get(output_file)
+        if rows:
+            write_chunk(output_file, rows)
+        self.buffers.pop(output_file, None)
+        self.first_buffered.pop(output_file, None)
+
+    def _run(self):
+        while True:
+            try:
+                command, output_file, payload = self.queue.get(timeout=self.flush_seconds / 2)
+            except queue.Empty:
+                command = None
+
+            try:
+                if command == 'row':
+                    self.buffers.setdefault(output_file, []).append(payload)
+                    self.first_buffered.setdefault(output_file, time.time())
+                    if len(self.buffers[output_file]) >= self.flush_count:
+                        self._flush(output_file)
+                elif command in ('flush', 'finish'):
+                    done, reply = payload
+                    try:
+                        self._flush(output_file)
+                        if command == 'finish':
+                            reply['result'] = finalize(output_file)
+                            print(f"Saved {reply['result']} swimmers to {output_file}")
+                    except Exception as e:
+                        reply['error'] = e
+                    finally:
+                        done.set()
+                elif command == 'stop':
+                    for pending in list(self.buffers):
+                        try:
+                            self._flush(pending)
+                        except Exception as e:
+                            print(f"Error writing roster output, {len(self.buffers[pending])} rows "
+                                  f"for {pending} not saved: {e}")
+                    return
+
+                # Time-based flush for teams that are trickling in slowly
+                now = time.time()
+                for pending, since in list(self.first_buffered.items()):
+                    if now - since >= self.flush_seconds:
+                        self._flush(pending)
+            except Exception as e:
+                print(f"Error writing roster output: {e}")
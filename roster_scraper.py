@@ -29,11 +29,26 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
 from queue import Queue
 import multiprocessing
+from roster_export import RosterWriter, saved_swimmer_ids, staging_path
+import shutil
 
-def setup_driver():
-    """Setup and return a Chrome driver with proper options"""
+# Only the roster tbody is read, so nothing else on the page needs to load
+BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.css", "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*hotjar.com*", "*quantserve.com*", "*scorecardresearch.com*",
+]
+
+def setup_driver(lean=True):
+    """Setup and return a Chrome driver with proper options
+
+    The lean profile runs truly headless, skips images, CSS, fonts and
+    analytics, and hands control back once the DOM is ready (callers already
+    wait for the tbody they need). lean=False is the full visible browser,
+    for watching a scrape or comparing in `benchmark.py browser`.
+    """
     chrome_options = Options()
-    chrome_options.headless = False  # Set to False to see the browser
     chrome_options.add_argument("--disable-gpu")
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
@@ -41,6 +56,16 @@ def setup_driver():
     chrome_options.add_argument('--disable-blink-features=AutomationControlled')
     chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
     chrome_options.add_experimental_option('useAutomationExtension', False)
+    if lean:
+        chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument("--disable-extensions")
+        chrome_options.add_argument("--disable-component-extensions-with-background-pages")
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+        chrome_options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.managed_default_content_settings.stylesheets": 2,
+        })
+        chrome_options.page_load_strategy = 'eager'
     
     # Use webdriver_manager to handle ChromeDriver installation
     driver = webdriver.Chrome(
@@ -48,6 +73,10 @@ def setup_driver():
         options=chrome_options
     )
     driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+    if lean:
+        # Fonts and third-party scripts have no content setting; block them at the network layer
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URLS})
     return driver
 
 def get_team_ids():
@@ -296,22 +325,45 @@ def save_roster_ids():
         json.dump(team_rosters, f)
     print(f"\nSaved roster IDs for {len(team_rosters)} teams to rosters.json")
 
-def scrape_team(team_id, swimmer_ids):
+def build_swimmer_index(team_rosters):
+    """Map each swimmer ID to every team whose roster lists it, in team ID order"""
+    index = {}
+    for team_id in sorted(team_rosters, key=int):
+        for sid in team_rosters[team_id]:
+            teams = index.setdefault(str(sid), [])
+            if team_id not in teams:
+                teams.append(team_id)
+    return index
+
+def team_file_ids(team_id):
+    """Swimmer IDs already saved for a team, including rows staged but not yet in its workbook"""
+    output_file = f"output/team_{team_id}_roster.xlsx"
+    try:
+        return saved_swimmer_ids(output_file)
+    except Exception as e:
+        print(f"Error reading {output_file}: {e}")
+        return set()
+
+def scraped_swimmer_ids(team_ids):
+    """Swimmer IDs already saved under any of the given teams"""
+    scraped = set()
+    for team_id in team_ids:
+        scraped.update(team_file_ids(team_id))
+    return scraped
+
+def scrape_team(team_id, swimmer_ids, writer):
     """Second phase: Scrape a specific team's swimmers with 403 handling"""
     print(f"\nProcessing team {team_id} with {len(swimmer_ids)} swimmers...")
+    output_file = f"output/team_{team_id}_roster.xlsx"
+    swimmers = []
     
     while True:  # Keep trying until successful or all swimmers done
         try:
-            # Check for existing file and get already scraped swimmers
-            output_file = f"output/team_{team_id}_roster.xlsx"
-            scraped_swimmers = set()
-            if os.path.exists(output_file):
-                try:
-                    existing_df = pd.read_excel(output_file)
-                    scraped_swimmers = set(str(sid) for sid in existing_df['Swimmer ID'])
-                    print(f"Found {len(scraped_swimmers)} already scraped swimmers")
-                except Exception as e:
-                    print(f"Error reading existing file: {e}")
+            # Check saved and staged rows for already scraped swimmers
+            writer.flush(output_file)
+            scraped_swimmers = team_file_ids(team_id)
+            if scraped_swimmers:
+                print(f"Found {len(scraped_swimmers)} already scraped swimmers")
             
             # Filter out already scraped swimmers
             swimmers_to_scrape = [sid for sid in swimmer_ids if str(sid) not in scraped_swimmers]
@@ -319,10 +371,9 @@ def scrape_team(team_id, swimmer_ids):
             
             if not swimmers_to_scrape:
                 print("All swimmers already scraped!")
-                return []
+                break
             
-            # Scrape remaining swimmers
-            swimmers = []
+            # Scrape remaining swimmers; the writer thread batches them to disk
             with ThreadPoolExecutor(max_workers=min(NUM_WORKERS, len(swimmers_to_scrape))) as executor:
                 future_to_swimmer = {executor.submit(scrape_swimmer, sid): sid 
                                    for sid in swimmers_to_scrape}
@@ -333,12 +384,8 @@ def scrape_team(team_id, swimmer_ids):
                         result = future.result()
                         if result:
                             swimmers.append(result)
+                            writer.put(output_file, result)
                             print(f"Scraped swimmer {sid}")
-                            
-                            # Save progress after each swimmer
-                            if swimmers:
-                                save_to_excel(swimmers, output_file, mode='append')
-                                swimmers = []  # Clear after saving
                                 
                     except Exception as e:
                         if str(e) == "403_ERROR":
@@ -348,13 +395,17 @@ def scrape_team(team_id, swimmer_ids):
                             raise  # Re-raise to restart the team
                         print(f"Error scraping swimmer {sid}: {e}")
             
-            return swimmers  # Successfully completed
+            break  # Successfully completed
             
         except Exception as e:
             if str(e) == "403_ERROR":
                 continue  # Restart the team after cooldown
             print(f"Error processing team {team_id}: {e}")
-            return []
+            break
+
+    # Write the team's workbook in one streaming pass
+    writer.finish(output_file)
+    return swimmers
 
 def scrape_teams():
     """Second phase: Process saved rosters with redo option"""
@@ -369,6 +420,11 @@ def scrape_teams():
         return
     
     print(f"Loaded {len(team_rosters)} teams from rosters.json")
+
+    # Transfers appear on several rosters; index every ID once so each swimmer is scraped once
+    swimmer_index = build_swimmer_index(team_rosters)
+    shared = sum(1 for teams in swimmer_index.values() if len(teams) > 1)
+    print(f"{len(swimmer_index)} unique swimmers, {shared} listed on more than one roster")
     
     # Get list of already processed teams
     processed_teams = set()
@@ -382,8 +438,8 @@ def scrape_teams():
             for tid in processed_teams:
                 print(f"Team {tid}: already processed")
     
-    # Get unprocessed teams
-    unprocessed_teams = [tid for tid in team_rosters.keys() if tid not in processed_teams]
+    # Get unprocessed teams, in the same order the index assigns shared swimmers
+    unprocessed_teams = sorted((tid for tid in team_rosters.keys() if tid not in processed_teams), key=int)
     print(f"\n{len(unprocessed_teams)} teams remaining to process")
     
     # Ask user what they want to do
@@ -392,90 +448,73 @@ def scrape_teams():
     print("2. Redo specific team")
     choice = input("Enter your choice (1 or 2): ")
     
-    if choice == "1":
-        # Process remaining teams
-        print("\nProcessing remaining teams:")
-        for team_id in unprocessed_teams:
-            print(f"Team {team_id}: {len(team_rosters[team_id])} swimmers")
-            try:
-                print(f"\nProcessing team {team_id}...")
-                swimmers = scrape_team(team_id, team_rosters[team_id])
-                if swimmers:
-                    print(f"Successfully processed team {team_id}")
-                else:
-                    print(f"No new swimmers processed for team {team_id}")
-            except Exception as e:
-                print(f"Error processing team {team_id}: {e}")
-                continue
+    # One writer thread owns all roster files for the whole run
+    with RosterWriter() as writer:
+        if choice == "1":
+            # Process remaining teams
+            print("\nProcessing remaining teams:")
+            claimed = scraped_swimmer_ids(processed_teams)
+            for team_id in unprocessed_teams:
+                print(f"Team {team_id}: {len(team_rosters[team_id])} swimmers")
+                try:
+                    print(f"\nProcessing team {team_id}...")
+                    # Skip swimmers already scraped with an earlier team
+                    swimmer_ids = [sid for sid in team_rosters[team_id] if str(sid) not in claimed]
+                    skipped = len(team_rosters[team_id]) - len(swimmer_ids)
+                    if skipped:
+                        print(f"Skipping {skipped} swimmers already scraped with another team")
+                    swimmers = scrape_team(team_id, swimmer_ids, writer)
+                    claimed.update(team_file_ids(team_id))
+                    if swimmers:
+                        print(f"Successfully processed team {team_id}")
+                    else:
+                        print(f"No new swimmers processed for team {team_id}")
+                except Exception as e:
+                    print(f"Error processing team {team_id}: {e}")
+                    continue
     
-    elif choice == "2":
-        # Redo specific team
-        print("\nAvailable teams to redo:")
-        all_teams = sorted(team_rosters.keys())
-        for i, tid in enumerate(all_teams, 1):
-            swimmer_count = len(team_rosters[tid])
-            status = "processed" if tid in processed_teams else "not processed"
-            print(f"{i}. Team {tid}: {swimmer_count} swimmers ({status})")
+        elif choice == "2":
+            # Redo specific team
+            print("\nAvailable teams to redo:")
+            all_teams = sorted(team_rosters.keys())
+            for i, tid in enumerate(all_teams, 1):
+                swimmer_count = len(team_rosters[tid])
+                status = "processed" if tid in processed_teams else "not processed"
+                print(f"{i}. Team {tid}: {swimmer_count} swimmers ({status})")
         
-        try:
-            team_idx = int(input("\nEnter team number to redo: ")) - 1
-            if 0 <= team_idx < len(all_teams):
-                team_id = all_teams[team_idx]
+            try:
+                team_idx = int(input("\nEnter team number to redo: ")) - 1
+                if 0 <= team_idx < len(all_teams):
+                    team_id = all_teams[team_idx]
                 
-                # Delete existing file if it exists
-                output_file = f"output/team_{team_id}_roster.xlsx"
-                if os.path.exists(output_file):
-                    os.remove(output_file)
-                    print(f"Deleted existing file for team {team_id}")
+                    # Delete existing file if it exists
+                    output_file = f"output/team_{team_id}_roster.xlsx"
+                    if os.path.exists(output_file):
+                        os.remove(output_file)
+                        print(f"Deleted existing file for team {team_id}")
+                    shutil.rmtree(staging_path(output_file), ignore_errors=True)
                 
-                # Process team
-                print(f"\nRedoing team {team_id}...")
-                swimmers = scrape_team(team_id, team_rosters[team_id])
-                if swimmers:
-                    print(f"Successfully reprocessed team {team_id}")
+                    # Process team, leaving swimmers saved under other teams alone
+                    print(f"\nRedoing team {team_id}...")
+                    other_teams = {tid for sid in team_rosters[team_id] for tid in swimmer_index[str(sid)] if tid != team_id}
+                    claimed = scraped_swimmer_ids(other_teams)
+                    swimmers = scrape_team(team_id, [sid for sid in team_rosters[team_id] if str(sid) not in claimed], writer)
+                    if swimmers:
+                        print(f"Successfully reprocessed team {team_id}")
+                    else:
+                        print(f"Failed to reprocess team {team_id}")
                 else:
-                    print(f"Failed to reprocess team {team_id}")
-            else:
-                print("Invalid team number")
-        except ValueError:
-            print("Invalid input")
+                    print("Invalid team number")
+            except ValueError:
+                print("Invalid input")
+            except Exception as e:
+                print(f"Error reprocessing team {team_id}: {e}")
     
-    else:
-        print("Invalid choice")
+        else:
+            print("Invalid choice")
     
     print("\nScraping complete")
 
-def save_to_excel(results, filename, mode='write'):
-    """Thread-safe Excel saving with append mode"""
-    if not results:
-        return
-        
-    # Ensure output directory exists
-    os.makedirs("output", exist_ok=True)
-    
-    flattened = []
-    for res in results:
-        if res:
-            teams_str = ", ".join(res["teams"]) if res["teams"] else ""
-            best_times_str = "; ".join([f"{bt['event']}: {bt['time']}" 
-                                      for bt in res["best_times"]]) if res["best_times"] else ""
-            flattened.append({
-                "Swimmer ID": res["swimmer_id"],
-                "Name": res["name"],
-                "Current Team": res["current_team"],
-                "Teams": teams_str,
-                "Best Times": best_times_str
-            })
-    
-    # Use a lock for thread-safe file writing
-    with threading.Lock():
-        df = pd.DataFrame(flattened)
-        if mode == 'append' and os.path.exists(filename):
-            existing_df = pd.read_excel(filename)
-            df = pd.concat([existing_df, df], ignore_index=True)
-        df.to_excel(filename, index=False)
-        print(f"Saved {len(results)} swimmers to {filename}")
-
 def cleanup_chrome():
     """Close all Chrome windows and chromedriver processes"""
     print("Cleaning up Chrome processes...")
@@ -0,0 +1,221 @@
+"""Typo-tolerant swimmer search over name, team and initials
+
+Every word of a swimmer's name and team (plus their initials) is a token in
+one sorted vocabulary, with a posting list of the swimmers that carry it.
+A query word matches tokens three ways:
+
+- by prefix, a bisect into the sorted vocabulary ("ledec" -> "ledecky")
+- by shared trigrams, for typos ("ledeky" -> "ledecky"), scored with the
+  Dice coefficient over a trigram -> token index
+- by swapping adjacent letters ("smtih" -> "smith"), which trigrams miss
+
+Lookups touch only the matching tokens' postings, so cost grows with the
+number of hits rather than the roster size. The same index is exported as
+public/search_index.json for the client; trigrams are rebuilt from the token
+list on load rather than shipped.
+
+    python search.py "katie ledeky"
+"""
+import argparse
+import json
+import os
+import re
+import unicodedata
+from bisect import bisect_left
+
+import numpy as np
+
+# Score of a token match is multiplied by the weight of the field it came from
+FIELD_WEIGHTS = {'name': 1.0, 'initials': 0.8, 'team': 0.6}
+PREFIX_BASE = 0.7         # Prefix score rises from this toward 1.0 as the prefix covers the token
+TYPO_WEIGHT = 0.9         # Best score a trigram-only (misspelled) match can get
+MIN_SIMILARITY = 0.45     # Dice coefficient below which a trigram match is ignored
+MIN_TYPO_LENGTH = 3       # Shorter query words only match by prefix
+MAX_TOKEN_MATCHES = 64    # Vocabulary tokens considered per query word
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+def normalize(text):
+    """Lowercase, accent-free words: "Zoë O'Neil" -> ['zoe', 'oneil']"""
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKD', str(text)).encode('ascii', 'ignore').decode().lower()
+    return _WORD.findall(text.replace("'", ''))
+
+
+def trigrams(token):
+    padded = f" {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def initials_of(name):
+    return ''.join(word[0] for word in normalize(name)[:2])
+
+
+class SearchIndex:
+    """Token vocabulary with CSR posting lists and a trigram index over the tokens"""
+
+    def __init__(self, ids, names, teams, elos=None):
+        self.ids = list(ids)
+        self.names = list(names)
+        self.teams = list(teams)
+        self.elos = np.zeros(len(self.ids)) if elos is None else np.asarray(elos, dtype=float)
+        self.row_index = {swimmer_id: i for i, swimmer_id in enumerate(self.ids)}
+
+        postings = {}
+        for row, (name, team) in enumerate(zip(self.names, self.teams)):
+            fields = (
+                ('name', normalize(name)),
+                ('initials', [initials_of(name)]),
+                ('team', normalize(team))
+            )
+            for field, tokens in fields:
+                for token in tokens:
+                    if token:
+                        weights = postings.setdefault(token, {})
+                        weights[row] = max(weights.get(row, 0.0), FIELD_WEIGHTS[field])
+        self._build(sorted(postings), [postings[token] for token in sorted(postings)])
+
+    def _build(self, vocab, postings):
+        self.vocab = vocab
+        sizes = [len(p) for p in postings]
+        self.token_ptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=self.token_ptr[1:])
+        self.token_rows = np.fromiter((row for p in postings for row in p), dtype=np.int32,
+                                      count=self.token_ptr[-1])
+        self.token_weights = np.fromiter((w for p in postings for w in p.values()), dtype=np.float32,
+                                         count=self.token_ptr[-1])
+
+        grams = {}
+        self.gram_counts = np.zeros(len(vocab), dtype=np.int32)
+        for token_id, token in enumerate(vocab):
+            token_grams = trigrams(token)
+            self.gram_counts[token_id] = len(token_grams)
+            for gram in token_grams:
+                grams.setdefault(gram, []).append(token_id)
+        self.gram_tokens = {gram: np.array(ids, dtype=np.int32) for gram, ids in grams.items()}
+
+    @classmethod
+    def from_records(cls, records):
+        records = list(records)
+        return cls([r.id for r in records], [r.name for r in records],
+                   [r.team for r in records], [r.elo for r in records])
+
+    @classmethod
+    def from_swimmers(cls, swimmers):
+        """Build from a swimmers dict shaped like public/swimmers.json"""
+        return cls(list(swimmers), [s.get('name') for s in swimmers.values()],
+                   [s.get('team') for s in swimmers.values()],
+                   [s.get('elo', 0) for s in swimmers.values()])
+
+    def match_tokens(self, word):
+        """Vocabulary token IDs matching one query word, with their match scores"""
+        matches = {}
+
+        # Prefix matches, closest to an exact match first
+        lo = bisect_left(self.vocab, word)
+        hi = bisect_left(self.vocab, word + '\x7f', lo)
+        for token_id in range(lo, hi):
+            matches[token_id] = PREFIX_BASE + (1 - PREFIX_BASE) * len(word) / len(self.vocab[token_id])
+
+        if len(word) >= MIN_TYPO_LENGTH:
+            for i in range(len(word) - 1):
+                swapped = word[:i] + word[i + 1] + word[i] + word[i + 2:]
+                token_id = bisect_left(self.vocab, swapped)
+                if token_id < len(self.vocab) and self.vocab[token_id] == swapped:
+                    matches[token_id] = max(matches.get(token_id, 0.0), TYPO_WEIGHT)
+
+            word_grams = trigrams(word)
+            hits = [self.gram_tokens[g] for g in word_grams if g in self.gram_tokens]
+            if hits:
+                token_ids, shared = np.unique(np.concatenate(hits), return_counts=True)
+                dice = 2 * shared / (len(word_grams) + self.gram_counts[token_ids])
+                keep = dice >= MIN_SIMILARITY
+                for token_id, score in zip(token_ids[keep].tolist(), (dice[keep] * TYPO_WEIGHT).tolist()):
+                    if score > matches.get(token_id, 0.0):
+                        matches[token_id] = score
+
+        if len(matches) > MAX_TOKEN_MATCHES:
+            matches = dict(sorted(matches.items(), key=lambda m: -m[1])[:MAX_TOKEN_MATCHES])
+        return matches
+
+    def search(self, query, limit=10):
+        """Ranked hits as (swimmer id, name, team, score); higher score is better"""
+        words = normalize(query)
+        if not words:
+            return []
+
+        totals = np.zeros(len(self.ids), dtype=np.float32)
+        for word in words:
+            matches = self.match_tokens(word)
+            if not matches:
+                continue
+            # Each query word counts once per swimmer: its best-matching token
+            best = np.zeros(len(self.ids), dtype=np.float32)
+            for token_id, score in matches.items():
+                start, end = self.token_ptr[token_id], self.token_ptr[token_id + 1]
+                rows = self.token_rows[start:end]
+                np.maximum.at(best, rows, self.token_weights[start:end] * score)
+            totals += best
+
+        hit_rows = np.flatnonzero(totals)
+        if len(hit_rows) > limit:
+            hit_rows = hit_rows[np.argpartition(-totals[hit_rows], limit - 1)[:limit]]
+        # Best score first; among equal scores the higher-rated swimmer
+        hit_rows = hit_rows[np.lexsort((-self.elos[hit_rows], -totals[hit_rows]))]
+        return [
+            (self.ids[row], self.names[row], self.teams[row], round(float(totals[row]), 3))
+            for row in hit_rows
+        ]
+
+    def to_json(self):
+        """Compact form: swimmers, the sorted vocabulary and per-token [row, weight] postings"""
+        return {
+            'swimmers': [[swimmer_id, name, team] for swimmer_id, name, team in zip(self.ids, self.names, self.teams)],
+            'elo': [round(float(elo), 1) for elo in self.elos],
+            'tokens': self.vocab,
+            'postings': [
+                [[int(row), float(weight)] for row, weight in zip(
+                    self.token_rows[self.token_ptr[t]:self.token_ptr[t + 1]].tolist(),
+                    self.token_weights[self.token_ptr[t]:self.token_ptr[t + 1]].tolist()
+                )]
+                for t in range(len(self.vocab))
+            ]
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        """Load an exported index without re-tokenizing the swimmers"""
+        index = cls.__new__(cls)
+        index.ids, index.names, index.teams = (list(column) for column in zip(*data['swimmers'])) \
+            if data['swimmers'] else ([], [], [])
+        index.elos = np.asarray(data['elo'], dtype=float)
+        index.row_index = {swimmer_id: i for i, swimmer_id in enumerate(index.ids)}
+        index._build(data['tokens'], [dict(posting) for posting in data['postings']])
+        return index
+
+
+def export_search_index(index, output_dir='public'):
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, 'search_index.json')
+    with open(path, 'w') as f:
+        json.dump(index.to_json(), f, separators=(',', ':'))
+    print(f"Search index of {len(index.vocab)} tokens over {len(index.ids)} swimmers saved to {path}")
+    return index
+
+
+def load_search_index(path='public/search_index.json'):
+    with open(path) as f:
+        return SearchIndex.from_json(json.load(f))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Search swimmers by name, team or initials')
+    parser.add_argument('query', help='Search text, typos allowed')
+    parser.add_argument('--index', default='public/search_index.json', help='Exported search index')
+    parser.add_argument('--limit', type=int, default=10, help='Number of hits to list')
+    args = parser.parse_args()
+
+    for swimmer_id, name, team, score in load_search_index(args.index).search(args.query, args.limit):
+        print(f"{score:>6.2f}  {name:<30} {team:<35} {swimmer_id}")
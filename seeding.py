@@ -0,0 +1,124 @@
+"""Initial ratings for new swimmers derived from their best times
+
+Each swimmer's overall points score (top-4 weighted, as in pointsCalculator)
+is mapped linearly onto ELO. The line is fitted against swimmers that already
+have enough votes; until there are enough of those it falls back to spreading
+the scores around 1500 by their z-score. The fitted line is saved so single
+adds (fetch_single_swimmer, api/add-swimmer) seed on the same scale. Single
+adds only load the line and score one swimmer in plain Python, so NumPy is
+imported just by the batch functions.
+"""
+import json
+import os
+
+from events import BestTimesMatrix
+from points import overall_scores, points_matrix, swimmer_score
+
+DEFAULT_ELO = 1500.0
+MIN_SEED = 1200.0
+MAX_SEED = 1800.0
+MIN_RATINGS = 10          # Votes before a swimmer's ELO is trusted for calibration
+MIN_SAMPLES = 30          # Calibrated swimmers needed to fit the line
+FALLBACK_SPREAD = 100.0   # ELO per standard deviation of score when uncalibrated
+CALIBRATION_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output', 'seed_calibration.json')
+
+
+class SeedCalibration:
+    """elo = intercept + slope * overall score, clipped to [MIN_SEED, MAX_SEED]"""
+
+    def __init__(self, intercept=DEFAULT_ELO, slope=0.0, samples=0):
+        self.intercept = float(intercept)
+        self.slope = float(slope)
+        self.samples = int(samples)
+
+    def predict(self, scores):
+        import numpy as np
+
+        seeds = self.intercept + self.slope * np.asarray(scores, dtype=float)
+        return np.round(np.clip(seeds, MIN_SEED, MAX_SEED), 1)
+
+    def predict_one(self, score):
+        return round(min(max(self.intercept + self.slope * score, MIN_SEED), MAX_SEED), 1)
+
+    def save(self, path=CALIBRATION_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({'intercept': self.intercept, 'slope': self.slope, 'samples': self.samples}, f)
+
+    @classmethod
+    def load(cls, path=CALIBRATION_PATH):
+        """Saved calibration, or a flat 1500 seed if none has been fitted yet"""
+        try:
+            with open(path) as f:
+                return cls(**json.load(f))
+        except (FileNotFoundError, ValueError, TypeError):
+            return cls()
+
+
+def fit_calibration(scores, elos, counts):
+    """Fit the score -> ELO line on well-voted swimmers, or fall back to a z-score spread"""
+    import numpy as np
+
+    scores = np.asarray(scores, dtype=float)
+    elos = np.asarray(elos, dtype=float)
+    counts = np.asarray(counts, dtype=float)
+
+    trusted = (counts >= MIN_RATINGS) & (scores > 0) & np.isfinite(elos)
+    if trusted.sum() >= MIN_SAMPLES:
+        slope, intercept = np.polyfit(scores[trusted], elos[trusted], 1, w=np.sqrt(counts[trusted]))
+        if slope > 0:
+            return SeedCalibration(intercept, slope, trusted.sum())
+
+    scored = scores[scores > 0]
+    if len(scored) < 2 or scored.std() == 0:
+        return SeedCalibration()
+    slope = FALLBACK_SPREAD / scored.std()
+    return SeedCalibration(DEFAULT_ELO - slope * scored.mean(), slope, 0)
+
+
+def record_scores(records):
+    """Overall points score for each SwimmerRecord, in order"""
+    return overall_scores(points_matrix(BestTimesMatrix.from_records(records)))
+
+
+def seed_records(records, existing, calibration=None):
+    """Keep the ELO of swimmers with votes and seed the rest; returns the calibration used
+
+    existing maps swimmer ID -> current swimmer_ratings row (elo, ratings_count).
+    Rows without votes only hold the old 1500 default, so they are re-seeded.
+    The line is fitted on `existing` unless a calibration is passed in.
+    """
+    records = list(records)
+    scores = record_scores(records)
+    current = [existing.get(record.id) or {} for record in records]
+    if calibration is None:
+        calibration = fit_calibration(
+            scores,
+            [row.get('elo', float('nan')) for row in current],
+            [row.get('ratings_count') or 0 for row in current]
+        )
+
+    seeds = calibration.predict(scores)
+    for record, row, seed, score in zip(records, current, seeds, scores):
+        if row.get('ratings_count'):
+            record.elo = float(row['elo'])
+            record.ratings_count = int(row.get('ratings_count') or 0)
+        else:
+            record.elo = float(seed) if score > 0 else DEFAULT_ELO
+            record.ratings_count = 0
+    return calibration
+
+
+def seed_rating(best_times, calibration=None):
+    """Seed ELO for one swimmer's best_times dict (single adds)"""
+    calibration = calibration or SeedCalibration.load()
+    score = swimmer_score(best_times)
+    return calibration.predict_one(score) if score > 0 else DEFAULT_ELO
+
+
+def initial_rating(client, swimmer_id, best_times):
+    """(elo, ratings_count) for a single add: the existing rating if it has votes, else a seed"""
+    rows = client.table('swimmer_ratings').select('elo, ratings_count').eq('id', swimmer_id).execute().data
+    if rows and rows[0]['ratings_count']:
+        return rows[0]['elo'], rows[0]['ratings_count'] or 0
+    return seed_rating(best_times), 0
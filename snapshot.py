@@ -0,0 +1,161 @@
+"""Back up and restore the Supabase swimmer_ratings table as local columnar snapshots
+
+A snapshot is a directory holding one gzipped JSON array per column plus a
+manifest with the row count and a SHA-256 of every column file:
+
+    snapshots/swimmer_ratings-20250101T120000Z/
+        manifest.json
+        id.json.gz
+        elo.json.gz
+        ...
+
+Reads use db.fetch_range's keyset pagination (id > last seen id) over
+disjoint id ranges, so ranges can be fetched in parallel and no page is ever
+an expensive OFFSET. Restores upsert in batches through sync_log, with the
+same retries and bounded concurrency as every other sync, and an interrupted
+restore resumes where it stopped.
+
+    python snapshot.py backup
+    python snapshot.py restore snapshots/swimmer_ratings-20250101T120000Z
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import string
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from itertools import product
+
+import db
+import sync_log
+
+TABLE = db.TABLE
+SNAPSHOT_DIR = 'snapshots'
+BATCH_SIZE = 500
+WORKERS = 8
+PREFIX_LENGTH = 1     # id ranges are split on this many leading digits
+
+
+def id_ranges(prefix_length=PREFIX_LENGTH):
+    """Disjoint [low, high) id ranges covering every string id, split on leading digits"""
+    bounds = [''.join(p) for p in product(string.digits, repeat=prefix_length)][1:]
+    lows = [None] + bounds
+    highs = bounds + [None]
+    return list(zip(lows, highs))
+
+
+def write_column(path, values):
+    """Gzip a column as JSON; returns its SHA-256"""
+    data = gzip.compress(json.dumps(values, separators=(',', ':')).encode(), mtime=0)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return hashlib.sha256(data).hexdigest()
+
+
+def backup(snapshot_dir=SNAPSHOT_DIR, workers=WORKERS, prefix_length=PREFIX_LENGTH):
+    """Snapshot the whole table; returns the snapshot directory"""
+    start = time.time()
+    rows = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(db.fetch_range, low, high) for low, high in id_ranges(prefix_length)]
+        for future in as_completed(futures):
+            rows.extend(future.result())
+    rows.sort(key=lambda row: row['id'])
+
+    columns = sorted({column for row in rows for column in row})
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    path = os.path.join(snapshot_dir, f"{TABLE}-{stamp}")
+    tmp_path = path + '.partial'
+    os.makedirs(tmp_path, exist_ok=True)
+
+    checksums = {}
+    for column in columns:
+        checksums[column] = write_column(
+            os.path.join(tmp_path, f"{column}.json.gz"), [row.get(column) for row in rows]
+        )
+
+    manifest = {
+        'table': TABLE,
+        'created_at': stamp,
+        'row_count': len(rows),
+        'columns': columns,
+        'sha256': checksums
+    }
+    with open(os.path.join(tmp_path, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    # Only a complete snapshot ever appears under its final name
+    os.replace(tmp_path, path)
+
+    print(f"Saved {len(rows)} rows to {path} in {time.time() - start:.1f}s")
+    return path
+
+
+def load_snapshot(path):
+    """Rows of a snapshot, after verifying every column checksum"""
+    with open(os.path.join(path, 'manifest.json')) as f:
+        manifest = json.load(f)
+
+    columns = {}
+    for column in manifest['columns']:
+        with open(os.path.join(path, f"{column}.json.gz"), 'rb') as f:
+            data = f.read()
+        if hashlib.sha256(data).hexdigest() != manifest['sha256'][column]:
+            raise ValueError(f"Checksum mismatch for column {column} in {path}")
+        columns[column] = json.loads(gzip.decompress(data))
+        if len(columns[column]) != manifest['row_count']:
+            raise ValueError(f"Column {column} has {len(columns[column])} rows, expected {manifest['row_count']}")
+
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*(columns[name] for name in names))]
+
+
+def restore(path, workers=WORKERS, batch_size=BATCH_SIZE):
+    """Upsert every row of a snapshot back into the table"""
+    start = time.time()
+    rows = load_snapshot(path)
+    batches = [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+
+    def upsert(batch):
+        db.get_supabase().table(TABLE).upsert(batch).execute()
+
+    log = sync_log.JobLog(f"restore-{os.path.basename(os.path.normpath(path))}")
+    sent, skipped, failed = sync_log.run_batches(log, batches, upsert, len(batches), workers)
+    if failed:
+        raise RuntimeError(f"{failed} of {len(batches)} batches failed; rerun the restore to resume")
+
+    print(f"Restored {len(rows)} rows from {path} in {time.time() - start:.1f}s")
+
+
+def latest_snapshot(snapshot_dir=SNAPSHOT_DIR):
+    if not os.path.isdir(snapshot_dir):
+        return None
+    names = sorted(n for n in os.listdir(snapshot_dir) if n.startswith(TABLE) and not n.endswith('.partial'))
+    return os.path.join(snapshot_dir, names[-1]) if names else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Back up or restore swimmer_ratings')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    backup_parser = subparsers.add_parser('backup', help='Write a new snapshot')
+    backup_parser.add_argument('--dir', default=SNAPSHOT_DIR)
+    backup_parser.add_argument('--workers', type=int, default=WORKERS)
+    backup_parser.add_argument('--prefix-length', type=int, default=PREFIX_LENGTH,
+                               help='Leading id digits per parallel range (10^n ranges)')
+
+    restore_parser = subparsers.add_parser('restore', help='Upsert a snapshot back into Supabase')
+    restore_parser.add_argument('path', nargs='?', help='Snapshot directory (default: latest)')
+    restore_parser.add_argument('--workers', type=int, default=WORKERS)
+    restore_parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    args = parser.parse_args()
+    if args.command == 'backup':
+        backup(args.dir, args.workers, args.prefix_length)
+    else:
+        path = args.path or latest_snapshot()
+        if not path:
+            parser.error('no snapshot found')
+        restore(path, args.workers, args.batch_size)
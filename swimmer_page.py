@@ -0,0 +1,215 @@
+"""Fetch, parse and upsert a single SwimCloud swimmer page
+
+The one Python code path behind `convert_to_elo.py --single-swimmer` and
+api/add-swimmer.py. Pages are fetched through one pooled requests.Session and
+cached in memory for CACHE_SECONDS, parsed with lxml when it is installed,
+and turned into a SwimmerRecord with canonical event names (events.py) and
+time_parser's seconds. New swimmers are seeded from their times (seeding.py);
+swimmers with votes keep their rating.
+
+Bulk work can be handed over as JSON on stdin, one result per ID on stdout:
+
+    echo '["1234567", "2345678"]' | python swimmer_page.py --batch
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import db
+import seeding
+from events import add_best_time
+from records import SwimmerRecord
+from time_parser import parse_time
+
+try:
+    import lxml  # noqa: F401
+    PARSER = 'lxml'
+except ImportError:
+    PARSER = 'html.parser'
+
+SWIMMER_URL = "https://www.swimcloud.com/swimmer/{}/"
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+POOL_SIZE = 16
+TIMEOUT = 15
+CACHE_SECONDS = 600
+CACHE_SIZE = 512
+BATCH_WORKERS = 8
+
+_session = None
+_session_lock = threading.Lock()
+_cache = OrderedDict()  # swimmer ID -> (fetched at, html)
+_cache_lock = threading.Lock()
+
+
+def get_session():
+    """One keep-alive session shared by every fetch, retrying 429/5xx with backoff"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers.update(HEADERS)
+            retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+            _session.mount('https://', adapter)
+        return _session
+
+
+def fetch_page(swimmer_id):
+    """Swimmer page HTML, from the cache when it was fetched recently"""
+    now = time.time()
+    with _cache_lock:
+        cached = _cache.get(swimmer_id)
+        if cached and now - cached[0] < CACHE_SECONDS:
+            _cache.move_to_end(swimmer_id)
+            return cached[1]
+
+    response = get_session().get(SWIMMER_URL.format(swimmer_id), timeout=TIMEOUT)
+    if response.status_code != 200:
+        raise Exception(f"Failed to fetch swimmer data: Status {response.status_code}")
+
+    with _cache_lock:
+        _cache[swimmer_id] = (now, response.text)
+        _cache.move_to_end(swimmer_id)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return response.text
+
+
+def parse_best_times(soup):
+    """{canonical event: {'time', 'seconds'}}, keeping the fastest time per event"""
+    best_times = {}
+    for row in soup.find_all('tr'):
+        # Current profile layout first, then the older c-table-clean layout
+        time_td = row.find('td', class_='u-text-end u-text-semi')
+        event_td = row.find('td', class_='u-text-truncate')
+        if time_td and event_td:
+            event, time_text = event_td.text.strip(), time_td.text.strip()
+        else:
+            cols = row.find_all('td', limit=2)
+            if len(cols) < 2 or not row.find_parent('table', class_='c-table-clean'):
+                continue
+            event, time_text = cols[0].text.strip(), cols[1].text.strip()
+
+        if event and time_text:
+            seconds = parse_time(time_text)
+            if seconds:
+                add_best_time(best_times, event, time_text, seconds)
+    return best_times
+
+
+def parse_team(soup):
+    meta_div = soup.find('div', {'class': 'c-toolbar__meta'})
+    if meta_div:
+        team_link = meta_div.find('a', href=lambda x: x and x.startswith('/team/'))
+        if team_link:
+            return team_link.text.strip()
+    subtitle = soup.find('div', {'class': 'c-toolbar__subtitle'})
+    if subtitle and subtitle.text.strip():
+        return subtitle.text.strip()
+    return "Unknown"
+
+
+def parse_swimmer(swimmer_id, html):
+    """SwimmerRecord from a swimmer page (ELO and ratings count left at defaults)"""
+    soup = BeautifulSoup(html, PARSER)
+
+    title = soup.find('h1', {'class': 'c-toolbar__title'}) or soup.find('h1')
+    if title is None:
+        raise Exception("Could not find swimmer name")
+    name = title.text.strip()
+
+    profile_image = None
+    media_div = soup.find('div', {'class': 'c-toolbar__media-user'})
+    if media_div:
+        img = media_div.find('img')
+        if img and 'src' in img.attrs:
+            profile_image = img['src']
+
+    twitter = None
+    instagram = None
+    # Profile social buttons only; the site's own footer links use other classes
+    for link in soup.find_all('a', class_=['btn-icon-plain', 'c-social-link'], href=True):
+        href = link['href']
+        if 'twitter.com' in href or '//x.com' in href:
+            twitter = twitter or href
+        elif 'instagram.com' in href:
+            instagram = instagram or href
+
+    return SwimmerRecord(
+        id=str(swimmer_id),
+        name=name,
+        team=parse_team(soup),
+        best_times=SwimmerRecord.pack_best_times(parse_best_times(soup)),
+        profile_image=profile_image,
+        initials=''.join(part[0] for part in name.split()[:2]).upper() if not profile_image else None,
+        twitter=twitter,
+        instagram=instagram
+    )
+
+
+def fetch_swimmer(swimmer_id):
+    return parse_swimmer(swimmer_id, fetch_page(str(swimmer_id)))
+
+
+def upsert_swimmer(record, client=None):
+    """Seed or keep the swimmer's rating, then upsert their swimmer_ratings row"""
+    client = client or db.get_supabase()
+    record.elo, record.ratings_count = seeding.initial_rating(client, record.id, record.best_times_dict())
+    client.table('swimmer_ratings').upsert(record.to_rating_row()).execute()
+    return record
+
+
+def add_swimmer(swimmer_id, client=None):
+    """Fetch, parse and upsert one swimmer; returns the swimmers.json-shaped dict"""
+    return upsert_swimmer(fetch_swimmer(swimmer_id), client).to_json()
+
+
+def add_swimmers(swimmer_ids, upsert=True, workers=BATCH_WORKERS):
+    """Process many IDs concurrently; each result is a swimmer dict or {'id', 'error'}"""
+    def one(swimmer_id):
+        try:
+            if upsert:
+                return add_swimmer(swimmer_id)
+            return fetch_swimmer(swimmer_id).to_json()
+        except Exception as e:
+            return {'id': str(swimmer_id), 'error': str(e)}
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(one, swimmer_ids))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Fetch and upsert SwimCloud swimmers')
+    parser.add_argument('swimmer_ids', nargs='*', help='Swimmer IDs to process')
+    parser.add_argument('--batch', action='store_true',
+                        help='Read a JSON list of IDs (or {"swimmerIds": [...]}) from stdin')
+    parser.add_argument('--no-upsert', action='store_true', help='Only fetch and parse')
+    parser.add_argument('--workers', type=int, default=BATCH_WORKERS)
+    args = parser.parse_args()
+
+    swimmer_ids = list(args.swimmer_ids)
+    if args.batch:
+        payload = json.load(sys.stdin)
+        swimmer_ids += payload['swimmerIds'] if isinstance(payload, dict) else payload
+    if not swimmer_ids:
+        parser.error('no swimmer IDs given')
+
+    results = add_swimmers(swimmer_ids, upsert=not args.no_upsert, workers=args.workers)
+    failed = sum(1 for result in results if 'error' in result)
+    print(f"Processed {len(results) - failed} swimmers, {failed} failed", file=sys.stderr)
+    print(json.dumps(results))
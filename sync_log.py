@@ -0,0 +1,142 @@
+"""Write-ahead job log for batched Supabase writes
+
+Every batch is identified by the SHA-256 of its payload. Before a batch is
+sent a "pending" entry is appended to the job's log, and "done" or "failed"
+once the request settles (each entry fsynced, one JSON object per line):
+
+    {"batch": 37, "hash": "9f2c...", "status": "done", "rows": 100, "ts": 1735732800.0}
+
+If a run ends with failed batches the log stays in output/.sync, and the next
+run of the same job skips every batch whose payload is already logged as
+done. Upserts are idempotent, so resending a batch that was in flight during
+a crash is harmless. Once every batch is done the log is archived and the
+next run starts fresh.
+"""
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timezone
+
+LOG_DIR = os.path.join('output', '.sync')
+WORKERS = 4             # Batches in flight at once
+RETRIES = 5
+BACKOFF_SECONDS = 1.0   # First retry delay, doubled (with jitter) on each further retry
+
+
+def payload_hash(rows):
+    return hashlib.sha256(
+        json.dumps(rows, sort_keys=True, separators=(',', ':'), default=str).encode()
+    ).hexdigest()
+
+
+class JobLog:
+    """Append-only batch status log for one job, e.g. the swimmer_ratings sync"""
+
+    def __init__(self, name, log_dir=LOG_DIR):
+        self.name = name
+        self.log_dir = log_dir
+        self.path = os.path.join(log_dir, f"{name}.jsonl")
+        self.lock = threading.Lock()
+        self.status = {}  # payload hash -> latest status
+        os.makedirs(log_dir, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        # A crash mid-append leaves a torn last line; drop it so new entries start clean
+        end = data.rfind(b'\n') + 1
+        if end < len(data):
+            with open(self.path, 'r+b') as f:
+                f.truncate(end)
+        for line in data[:end].splitlines():
+            entry = json.loads(line)
+            self.status[entry['hash']] = entry['status']
+
+    def is_done(self, digest):
+        return self.status.get(digest) == 'done'
+
+    def resumed(self):
+        """True when this run picks up an unfinished earlier run"""
+        return bool(self.status)
+
+    def record(self, batch, digest, status, rows, error=None):
+        entry = {'batch': batch, 'hash': digest, 'status': status, 'rows': rows, 'ts': time.time()}
+        if error:
+            entry['error'] = error
+        with self.lock:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self.status[digest] = status
+
+    def complete(self):
+        """Archive the log once every batch is done"""
+        if os.path.exists(self.path):
+            stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+            os.replace(self.path, os.path.join(self.log_dir, f"{self.name}-{stamp}.done.jsonl"))
+        self.status = {}
+
+
+def with_retries(fn, what, retries=RETRIES):
+    """Call fn(), retrying failures with jittered exponential backoff; shared by every Supabase read and write"""
+    for attempt in range(retries):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == retries - 1:
+                raise
+            delay = BACKOFF_SECONDS * 2 ** attempt * random.uniform(0.5, 1.5)
+            print(f"Error {what} ({e}), retrying in {delay:.1f}s...")
+            time.sleep(delay)
+
+
+def run_batches(log, batches, send, total=None, workers=WORKERS, retries=RETRIES):
+    """Send every batch not already done, at most `workers` at a time
+
+    batches may be a generator; only a bounded number are held in memory.
+    Returns (sent, skipped, failed) batch counts.
+    """
+    counts = {'sent': 0, 'skipped': 0, 'failed': 0}
+    if log.resumed():
+        print(f"Resuming {log.name}: skipping batches already applied")
+
+    def attempt(number, digest, batch):
+        try:
+            with_retries(lambda: send(batch), f"sending batch {number}", retries)
+        except Exception as e:
+            log.record(number, digest, 'failed', len(batch), str(e))
+            print(f"Batch {number} failed after {retries} attempts: {e}")
+            return 'failed'
+        log.record(number, digest, 'done', len(batch))
+        print(f"Updated batch {number}/{total or '?'}")
+        return 'sent'
+
+    def collect(done):
+        for future in done:
+            counts[future.result()] += 1
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for number, batch in enumerate(batches, 1):
+            digest = payload_hash(batch)
+            if log.is_done(digest):
+                counts['skipped'] += 1
+                continue
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            log.record(number, digest, 'pending', len(batch))
+            pending.add(executor.submit(attempt, number, digest, batch))
+        collect(wait(pending).done)
+
+    if not counts['failed']:
+        log.complete()
+    return counts['sent'], counts['skipped'], counts['failed']
@@ -0,0 +1,116 @@
+"""Team aggregates precomputed from the best-times matrix and ELO
+
+One groupby pass over every swimmer gives each team its roster size, ELO
+mean/median/max, the top-N points in every event and how many swimmers
+have a scored time in it (depth). The result is written as public/teams.json keyed
+by team name, so a team page is a single lookup:
+
+    {"Stanford University": {"swimmers": 31,
+                             "elo": {"mean": 1532.4, "median": 1521.0, "max": 1689.5},
+                             "strength": 9123,
+                             "events": {"100 Y Free": {"depth": 9, "points": [912, 884, 861]}, ...}}}
+
+``strength`` is the sum of every event's top-N points. Optionally the same
+data is upserted into a Supabase ``team_stats`` table (team text primary key,
+swimmers, mean_elo, median_elo, max_elo, strength, events jsonb).
+"""
+import json
+import os
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+import db
+import sync_log
+from events import BestTimesMatrix
+from points import points_matrix
+
+TOP_N = 3    # Scorers per event counted toward a team's event points and strength
+
+
+def team_frames(records):
+    """(swimmers DataFrame with team/elo, per-event points DataFrame) sharing one index"""
+    records = list(records)
+    matrix = BestTimesMatrix.from_records(records)
+    points = points_matrix(matrix)
+    index = pd.Index(matrix.ids, name='id')
+    swimmers = pd.DataFrame({
+        'team': [record.team or 'Unknown' for record in records],
+        'elo': np.array([record.elo for record in records], dtype=float)
+    }, index=index)
+    # NaN where a swimmer has no scored time, so it drops out of counts and rankings
+    event_points = pd.DataFrame(np.where(points > 0, points, np.nan),
+                                index=index, columns=[event.name for event in matrix.events])
+    return swimmers, event_points
+
+
+def team_aggregates(records, top_n=TOP_N):
+    """Team name -> aggregate dict, as written to teams.json"""
+    swimmers, event_points = team_frames(records)
+    teams = swimmers['team']
+
+    elo = swimmers.groupby('team')['elo'].agg(['count', 'mean', 'median', 'max'])
+    depth = event_points.notna().groupby(teams).sum()
+
+    # Rank swimmers within their team per event; the r-th best points are one groupby max
+    within_team = event_points.groupby(teams).rank(ascending=False, method='first')
+    ranked_points = [event_points.where(within_team == r).groupby(teams).max() for r in range(1, top_n + 1)]
+    top_points = np.stack([frame.reindex(elo.index).to_numpy() for frame in ranked_points], axis=-1)
+    strength = np.nansum(top_points, axis=(1, 2))
+    depth = depth.reindex(elo.index).to_numpy()
+
+    events = list(event_points.columns)
+    aggregates = {}
+    for i, (team, row) in enumerate(elo.iterrows()):
+        team_events = {}
+        for j in np.flatnonzero(depth[i]):
+            points = top_points[i, j]
+            team_events[events[j]] = {'depth': int(depth[i, j]), 'points': [int(p) for p in points[~np.isnan(points)]]}
+        aggregates[team] = {
+            'swimmers': int(row['count']),
+            'elo': {'mean': round(float(row['mean']), 1), 'median': round(float(row['median']), 1),
+                    'max': round(float(row['max']), 1)},
+            'strength': int(strength[i]),
+            'events': team_events
+        }
+    return aggregates
+
+
+def export_team_aggregates(aggregates, output_dir='public'):
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, 'teams.json')
+    with open(path, 'w') as f:
+        json.dump(aggregates, f, separators=(',', ':'))
+    print(f"Aggregates for {len(aggregates)} teams saved to {path}")
+    return aggregates
+
+
+def team_stat_rows(aggregates):
+    """Rows for the optional team_stats table (the event breakdown goes in a JSON column)"""
+    for team, stats in aggregates.items():
+        yield {
+            'team': team,
+            'swimmers': stats['swimmers'],
+            'mean_elo': stats['elo']['mean'],
+            'median_elo': stats['elo']['median'],
+            'max_elo': stats['elo']['max'],
+            'strength': stats['strength'],
+            'events': stats['events']
+        }
+
+
+def sync_team_stats(aggregates, batch_size=100):
+    """Upsert team aggregates into Supabase team_stats through the job log"""
+    rows = team_stat_rows(aggregates)
+    batches = iter(lambda: list(islice(rows, batch_size)), [])
+
+    def upsert(batch):
+        db.get_supabase().table('team_stats').upsert(batch, on_conflict='team').execute()
+
+    total = (len(aggregates) + batch_size - 1) // batch_size
+    sent, skipped, failed = sync_log.run_batches(sync_log.JobLog('team_stats'), batches, upsert, total)
+    if failed:
+        print(f"team_stats update incomplete: {failed} of {total} batches failed")
+    else:
+        print(f"team_stats update complete! ({sent} batches sent, {skipped} already applied)")
@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+from glicko import GlickoRatings, rate_votes, read_vote_log
+from vote_ingest import VoteIngestWorker, VoteLog
+
+PERIOD = 86400
+
+
+class MemoryStore:
+    """swimmer_ratings stand-in for the vote worker"""
+
+    def __init__(self, ids):
+        self.rows = {i: {'id': i, 'name': i, 'team': 'T', 'elo': 1500.0, 'ratings_count': 0} for i in ids}
+
+    def load(self, ids):
+        return {i: dict(self.rows[i]) for i in ids if i in self.rows}
+
+    def upsert(self, rows):
+        for row in rows:
+            self.rows[row['id']] = dict(row)
+
+
+def log_votes(path, votes):
+    with open(path, 'a') as f:
+        for ts, winner_id, loser_id in votes:
+            f.write(json.dumps({'winner_id': winner_id, 'loser_id': loser_id, 'user_id': None, 'ts': ts}) + '\n')
+
+
+@pytest.fixture
+def vote_log(tmp_path):
+    return VoteLog(str(tmp_path / 'votes.log'))
+
+
+def test_votes_already_in_rows_are_not_rated_again(vote_log):
+    log_votes(vote_log.path, [(1000 + i, 'a', 'b') for i in range(10)])
+    store = MemoryStore(['a', 'b'])
+    VoteIngestWorker(vote_log, store).run_once()
+    assert store.rows['a']['ratings_count'] == 10
+
+    ratings = GlickoRatings([])
+    rate_votes(ratings, read_vote_log(vote_log.path), PERIOD, 0, now=10 * PERIOD,
+               current=store.rows, reflected=vote_log.applied_offset())
+    rows = {row['id']: row for row in ratings.to_rating_rows()}
+    assert rows['a'] == {'id': 'a', 'elo': round(store.rows['a']['elo'], 2), 'ratings_count': 10}
+    assert rows['b']['ratings_count'] == 10
+
+
+def test_only_votes_after_the_checkpoint_count(vote_log):
+    log_votes(vote_log.path, [(1000 + i, 'a', 'b') for i in range(10)])
+    store = MemoryStore(['a', 'b'])
+    VoteIngestWorker(vote_log, store).run_once()
+    log_votes(vote_log.path, [(2000 + i, 'b', 'a') for i in range(5)])
+
+    ratings = GlickoRatings([])
+    rate_votes(ratings, read_vote_log(vote_log.path), PERIOD, 0, now=10 * PERIOD,
+               current=store.rows, reflected=vote_log.applied_offset())
+    rows = {row['id']: row for row in ratings.to_rating_rows()}
+    assert rows['a']['ratings_count'] == 15 and rows['b']['ratings_count'] == 15
+    assert rows['a']['elo'] < store.rows['a']['elo']
+
+
+def test_reflected_votes_stay_uncounted_across_runs(vote_log):
+    # One vote in a closed period, one in the period still open at the first run
+    log_votes(vote_log.path, [(1000, 'a', 'b'), (PERIOD + 1000, 'a', 'b')])
+    store = MemoryStore(['a', 'b'])
+    VoteIngestWorker(vote_log, store).run_once()
+
+    ratings = GlickoRatings([])
+    since = rate_votes(ratings, read_vote_log(vote_log.path), PERIOD, 0, now=PERIOD + 2000,
+                       current=store.rows, reflected=vote_log.applied_offset())
+    assert since == PERIOD
+
+    # Next run resumes from the saved state once the period has closed
+    ratings = GlickoRatings.from_state(json.loads(json.dumps(ratings.to_state())))
+    rate_votes(ratings, read_vote_log(vote_log.path), PERIOD, since, now=3 * PERIOD,
+               current=store.rows, reflected=vote_log.applied_offset())
+    assert {row['id']: row['ratings_count'] for row in ratings.to_rating_rows()} == {'a': 2, 'b': 2}
+
+
+def test_swimmers_without_rows_rate_every_vote(vote_log):
+    log_votes(vote_log.path, [(1000, 'a', 'b'), (1001, 'a', 'b')])
+    ratings = GlickoRatings([])
+    rate_votes(ratings, read_vote_log(vote_log.path), PERIOD, 0, now=10 * PERIOD)
+    rows = {row['id']: row for row in ratings.to_rating_rows()}
+    assert rows['a']['ratings_count'] == 2 and rows['a']['elo'] > 1500
+
+
+def test_old_four_column_state_loads():
+    ratings = GlickoRatings.from_state({'a': [1600.0, 80.0, 0.06, 12]})
+    assert ratings.count[0] == 12 and ratings.start[0] == 0
@@ -0,0 +1,94 @@
+import math
+import random
+
+import pytest
+
+from time_parser import (ParsedTime, error_counts, format_time, parse_time, parse_time_marker, parse_times,
+                         reset_error_counts)
+
+
+@pytest.fixture(autouse=True)
+def clean_error_counts():
+    reset_error_counts()
+    yield
+    reset_error_counts()
+
+
+@pytest.mark.parametrize('text, seconds', [
+    ('20.20', 20.2),
+    ('59.5', 59.5),
+    ('.99', 0.99),
+    ('1:37.39', 97.39),
+    ('10:00.00', 600.0),
+    ('1:05:57.00', 3957.0),
+    ('  1:37.39 ', 97.39),
+    ('22.10x', 22.1),
+    ('4:12.33*', 252.33),
+])
+def test_parses_times(text, seconds):
+    assert parse_time(text) == pytest.approx(seconds)
+
+
+@pytest.mark.parametrize('text', ['NT', 'NS', 'DQ', 'DNF', 'DNS', 'SCR', 'dq', ' NT '])
+def test_no_time_markers(text):
+    assert parse_time(text) is None
+    assert error_counts() == {'no time': 1}
+
+
+@pytest.mark.parametrize('text, reason', [
+    ('', 'unrecognized'),
+    ('abc', 'unrecognized'),
+    ('1:75.00', 'out of range'),
+    ('1:60:00.00', 'out of range'),
+    ('0.00', 'zero'),
+    ('22.10q', 'unknown marker'),
+])
+def test_rejects_bad_times(text, reason):
+    assert parse_time(text) is None
+    assert error_counts() == {reason: 1}
+
+
+@pytest.mark.parametrize('value', [None, 22.1, 22, b'22.10'])
+def test_rejects_non_strings(value):
+    assert parse_time(value) is None
+    assert error_counts() == {'not a string': 1}
+
+
+@pytest.mark.parametrize('text', ['22.10r', '22.10R', '1:01.50 r'])
+def test_relay_splits_are_not_best_times(text):
+    assert parse_time(text) is None
+    assert error_counts() == {'relay split': 1}
+    assert parse_time_marker(text).marker == 'relay'
+
+
+def test_parse_time_marker():
+    assert parse_time_marker('1:37.39') == ParsedTime(97.39, '')
+    assert parse_time_marker('22.10x') == ParsedTime(22.1, 'exhibition')
+    assert parse_time_marker('DQ') is None
+
+
+@pytest.mark.parametrize('seconds', [9.0, 20.2, 59.99, 60.0, 97.39, 599.99, 3600.0, 3957.0])
+def test_format_round_trip(seconds):
+    assert parse_time(format_time(seconds)) == pytest.approx(seconds)
+
+
+def test_random_round_trip():
+    rng = random.Random(7)
+    expected = [round(rng.uniform(9.0, 4000.0), 2) for _ in range(5000)]
+    parsed = parse_times([format_time(seconds) for seconds in expected])
+    assert max(abs(float(p) - e) for p, e in zip(parsed, expected)) < 1e-3
+
+
+def test_parse_times_marks_failures_nan():
+    parsed = parse_times(['20.20', 'DQ', '22.10r', None])
+    assert parsed[0] == pytest.approx(20.2)
+    assert all(math.isnan(value) for value in parsed[1:])
+
+
+def test_fuzz_never_raises():
+    rng = random.Random(11)
+    alphabet = '0123456789:.rRxX DQNT-*'
+    for _ in range(20000):
+        text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        seconds = parse_time(text)
+        assert seconds is None or (isinstance(seconds, float) and seconds > 0)
@@ -0,0 +1,130 @@
+"""Swim time parsing: "20.20", "1:37.39", "1:05:57.00", "22.1r", "DQ", ...
+
+parse_time() is the innermost loop of conversion, so it never prints or
+raises. Anything it can't turn into seconds is tallied in a shared counter
+(see error_counts()) and returned as None. That includes relay splits: a
+split isn't an individual best time, so parse_time() rejects it, while
+parse_time_marker() still returns it flagged with the 'relay' marker.
+"""
+import re
+import threading
+from collections import Counter
+from typing import NamedTuple
+
+# [[h:]m:]s[.fraction] with an optional marker suffix ("r" for relay splits, ...)
+TIME_PATTERN = re.compile(r'(?:(?:(\d+):)?(\d+):)?(\d+(?:\.\d*)?|\.\d+)\s*([A-Za-z*]{1,3})?')
+
+# Suffixes that qualify a valid time
+TIME_MARKERS = {'R': 'relay', 'X': 'exhibition', '*': 'converted'}
+# Whole-string entries that mean there is no time
+NO_TIME_MARKERS = {'NT', 'NS', 'DQ', 'DNF', 'DNS', 'DFS', 'SCR', 'DSQ', 'NP'}
+
+
+class ParsedTime(NamedTuple):
+    seconds: float
+    marker: str
+
+
+_errors = Counter()
+_errors_lock = threading.Lock()
+
+
+def _count(reason):
+    with _errors_lock:
+        _errors[reason] += 1
+
+
+def error_counts():
+    """Unparseable inputs seen so far, by reason"""
+    with _errors_lock:
+        return dict(_errors)
+
+
+def reset_error_counts():
+    with _errors_lock:
+        _errors.clear()
+
+
+def parse_time_marker(value):
+    """Parse a time into ParsedTime(seconds, marker), or None when there is no usable time"""
+    if not isinstance(value, str):
+        _count('not a string')
+        return None
+
+    text = value.strip()
+    match = TIME_PATTERN.fullmatch(text)
+    if match is None:
+        _count('no time' if text.upper() in NO_TIME_MARKERS else 'unrecognized')
+        return None
+
+    hours, minutes, seconds, suffix = match.groups()
+    seconds = float(seconds)
+    if minutes is not None:
+        minutes = int(minutes)
+        if seconds >= 60 or (hours is not None and minutes >= 60):
+            _count('out of range')
+            return None
+        seconds += minutes * 60 + (int(hours) * 3600 if hours is not None else 0)
+
+    marker = ''
+    if suffix:
+        marker = TIME_MARKERS.get(suffix.upper())
+        if marker is None:
+            _count('unknown marker')
+            return None
+
+    if seconds <= 0:
+        _count('zero')
+        return None
+    return ParsedTime(round(seconds, 3), marker)
+
+
+def parse_time(value):
+    """Parse an individual time into seconds, or None (relay splits included)"""
+    # Fast path for the shapes nearly every best time has: "ss.xx" and "m:ss.xx"
+    try:
+        minutes, sep, rest = value.strip().rpartition(':')
+    except (AttributeError, TypeError):
+        pass
+    else:
+        if rest.replace('.', '', 1).isdecimal():
+            seconds = float(rest)
+            if not sep:
+                if seconds > 0:
+                    return seconds
+            elif minutes.isdecimal() and seconds < 60:
+                seconds = round(int(minutes) * 60 + seconds, 3)
+                if seconds > 0:
+                    return seconds
+
+    # Hours, markers, and everything that gets counted as an error
+    parsed = parse_time_marker(value)
+    if parsed is None:
+        return None
+    if parsed.marker == 'relay':
+        _count('relay split')
+        return None
+    return parsed.seconds
+
+
+def parse_times(values):
+    """Parse many times at once into a float32 array (NaN where unparseable)"""
+    import numpy as np
+
+    out = np.empty(len(values), dtype=np.float32)
+    for i, value in enumerate(values):
+        seconds = parse_time(value)
+        out[i] = np.nan if seconds is None else seconds
+    return out
+
+
+def format_time(seconds):
+    """Inverse of parse_time for display: 97.39 -> "1:37.39" """
+    hundredths = int(round(seconds * 100))
+    minutes, hundredths = divmod(hundredths, 6000)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{hundredths // 100:02d}.{hundredths % 100:02d}"
+    if minutes:
+        return f"{minutes}:{hundredths // 100:02d}.{hundredths % 100:02d}"
+    return f"{hundredths // 100}.{hundredths % 100:02d}"
@@ -0,0 +1,311 @@
+"""Vote ingestion: append votes to a local log and apply them to swimmer_ratings in micro-batches
+
+Votes are never applied with a per-vote read-modify-write. The worker is the
+only writer: each interval it reads the votes appended since the last
+checkpoint, loads the current ratings of every swimmer involved once, replays
+the votes in log order with the same maths as eloCalculator.js (so a swimmer
+who appears twice in a batch sees their updated rating the second time), and
+writes the results back in a single bulk upsert before advancing the checkpoint.
+
+The computed rows and the offset they cover are written to a pending file
+before the upsert. They are absolute values, not increments, so if the worker
+dies between the upsert and the checkpoint, the next run replays that file
+instead of recomputing the batch, and no vote is counted twice.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import db
+from elo import calculate_new_elos
+
+LOG_PATH = 'votes/votes.log'
+FLUSH_SECONDS = 2.0    # Interval between micro-batches
+MAX_BATCH = 5000       # Votes applied per micro-batch at most
+LOAD_CHUNK = 500       # IDs per "in" filter when loading current ratings
+RATING_COLUMNS = 'id, name, team, elo, ratings_count'
+
+
+class VoteLog:
+    """Append-only JSON-lines vote log with a byte-offset checkpoint of applied votes"""
+
+    def __init__(self, path=LOG_PATH):
+        self.path = path
+        self.offset_path = path + '.offset'
+        self.pending_path = path + '.pending'
+        self.rejected_path = path + '.rejected'
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def append(self, winner_id, loser_id, user_id=None):
+        """Durably record one vote"""
+        line = json.dumps({
+            'winner_id': str(winner_id),
+            'loser_id': str(loser_id),
+            'user_id': user_id,
+            'ts': time.time()
+        }) + '\n'
+        with self.lock:
+            with open(self.path, 'a') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def applied_offset(self):
+        try:
+            with open(self.offset_path) as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def read_pending(self, max_votes=MAX_BATCH):
+        """Votes after the checkpoint, plus the offset just past the last one returned"""
+        offset = self.applied_offset()
+        votes = []
+        if not os.path.exists(self.path):
+            return votes, offset
+
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            while len(votes) < max_votes:
+                line = f.readline()
+                if not line.endswith(b'\n'):
+                    break  # Partially written line; pick it up next time
+                offset += len(line)
+                try:
+                    vote = json.loads(line)
+                except ValueError:
+                    vote = None
+                if is_valid_vote(vote):
+                    votes.append(vote)
+                else:
+                    self.reject(line, offset - len(line))
+        return votes, offset
+
+    def reject(self, line, offset):
+        """Quarantine an unusable log line so it is skipped, not retried forever"""
+        print(f"Skipping malformed vote at offset {offset}")
+        with open(self.rejected_path, 'ab') as f:
+            f.write(line)
+
+    def commit(self, offset):
+        """Atomically move the checkpoint past applied votes"""
+        tmp_path = self.offset_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(str(offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.offset_path)
+
+    def write_pending(self, rows, offset):
+        """Durably record a batch's resulting rows before they are upserted"""
+        tmp_path = self.pending_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'offset': offset, 'rows': rows}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.pending_path)
+
+    def read_pending_batch(self):
+        try:
+            with open(self.pending_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def clear_pending(self):
+        if os.path.exists(self.pending_path):
+            os.remove(self.pending_path)
+
+
+def is_valid_vote(vote):
+    """A vote names two different, non-empty swimmer IDs"""
+    if not isinstance(vote, dict):
+        return False
+    winner_id, loser_id = vote.get('winner_id'), vote.get('loser_id')
+    if not isinstance(winner_id, (str, int)) or not isinstance(loser_id, (str, int)):
+        return False
+    return str(winner_id) != '' and str(loser_id) != '' and str(winner_id) != str(loser_id)
+
+
+class SupabaseStore:
+    """swimmer_ratings in Supabase"""
+
+    def load(self, ids):
+        rows = {}
+        ids = list(ids)
+        for i in range(0, len(ids), LOAD_CHUNK):
+            result = db.get_supabase().table('swimmer_ratings') \
+                .select(RATING_COLUMNS) \
+                .in_('id', ids[i:i + LOAD_CHUNK]) \
+                .execute()
+            rows.update({row['id']: row for row in result.data})
+        return rows
+
+    def upsert(self, rows):
+        db.get_supabase().table('swimmer_ratings').upsert(rows).execute()
+
+
+class PostgresStore:
+    """swimmer_ratings in a plain Postgres database, as a local stand-in for Supabase"""
+
+    def __init__(self, dsn):
+        import psycopg2
+        from psycopg2.extras import execute_values
+        self.conn = psycopg2.connect(dsn)
+        self.execute_values = execute_values
+
+    def load(self, ids):
+        with self.conn.cursor() as cur:
+            cur.execute(
+                'SELECT id, name, team, elo, ratings_count FROM swimmer_ratings WHERE id = ANY(%s)',
+                (list(ids),)
+            )
+            columns = [c.name for c in cur.description]
+            return {row[0]: dict(zip(columns, row)) for row in cur.fetchall()}
+
+    def upsert(self, rows):
+        with self.conn, self.conn.cursor() as cur:
+            self.execute_values(
+                cur,
+                'INSERT INTO swimmer_ratings (id, name, team, elo, ratings_count) VALUES %s '
+                'ON CONFLICT (id) DO UPDATE SET elo = EXCLUDED.elo, ratings_count = EXCLUDED.ratings_count',
+                [(r['id'], r['name'], r['team'], r['elo'], r['ratings_count']) for r in rows]
+            )
+
+
+def apply_votes(votes, ratings):
+    """Replay votes in order against current ratings; returns (changed rows by id, skipped count)"""
+    changed = {}
+    skipped = 0
+    for vote in votes:
+        winner = changed.get(str(vote['winner_id'])) or ratings.get(str(vote['winner_id']))
+        loser = changed.get(str(vote['loser_id'])) or ratings.get(str(vote['loser_id']))
+        if winner is None or loser is None or winner is loser:
+            skipped += 1
+            continue
+
+        winner_elo, loser_elo, _ = calculate_new_elos(winner, loser)
+        changed[winner['id']] = {
+            **winner,
+            'elo': winner_elo,
+            'ratings_count': (winner.get('ratings_count') or 0) + 1
+        }
+        changed[loser['id']] = {
+            **loser,
+            'elo': loser_elo,
+            'ratings_count': (loser.get('ratings_count') or 0) + 1
+        }
+    return changed, skipped
+
+
+class VoteIngestWorker:
+    """Applies logged votes to a ratings store, one micro-batch per interval"""
+
+    def __init__(self, log, store, interval=FLUSH_SECONDS, max_batch=MAX_BATCH):
+        self.log = log
+        self.store = store
+        self.interval = interval
+        self.max_batch = max_batch
+
+    def finish_pending(self):
+        """Store a batch whose results were computed but may not have been upserted"""
+        pending = self.log.read_pending_batch()
+        if pending is None:
+            return
+        if pending['rows']:
+            self.store.upsert(pending['rows'])
+        self.log.commit(pending['offset'])
+        self.log.clear_pending()
+
+    def run_once(self):
+        """Apply one micro-batch; returns the number of votes consumed"""
+        # A batch left over from a crash goes first, as stored rows, never recomputed
+        self.finish_pending()
+
+        start_offset = self.log.applied_offset()
+        votes, end_offset = self.log.read_pending(self.max_batch)
+        if not votes:
+            if end_offset != start_offset:
+                self.log.commit(end_offset)  # Only rejected lines
+            return 0
+
+        ids = {str(vote['winner_id']) for vote in votes} | {str(vote['loser_id']) for vote in votes}
+        ratings = self.store.load(ids)
+        changed, skipped = apply_votes(votes, ratings)
+        self.log.write_pending(list(changed.values()), end_offset)
+        # Only advance past votes whose results are stored, so a failed upsert is retried
+        self.finish_pending()
+
+        print(f"Applied {len(votes) - skipped} votes to {len(changed)} swimmers"
+              + (f" ({skipped} skipped)" if skipped else ""))
+        return len(votes)
+
+    def run_forever(self):
+        while True:
+            try:
+                consumed = self.run_once()
+            except Exception as e:
+                print(f"Error applying votes: {e}")
+                consumed = 0
+            # Drain a backlog immediately, otherwise wait for the next interval
+            if consumed < self.max_batch:
+                time.sleep(self.interval)
+
+
+def serve(log, host='127.0.0.1', port=8788):
+    """Accept votes as POST /votes {"winner_id", "loser_id", "user_id"}"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != '/votes':
+                self.send_error(404)
+                return
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            except ValueError:
+                body = None
+            if not is_valid_vote(body):
+                self.send_error(400, 'Expected a JSON object with different winner_id and loser_id')
+                return
+            log.append(body['winner_id'], body['loser_id'], body.get('user_id'))
+            self.send_response(202)
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+
+        def do_OPTIONS(self):
+            self.send_response(204)
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
+            self.send_header('Access-Control-Allow-Headers', 'content-type')
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    print(f"Accepting votes on http://{host}:{port}/votes")
+    ThreadingHTTPServer((host, port), Handler).serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Ingest votes and apply them in micro-batches')
+    parser.add_argument('--log', default=LOG_PATH, help='Vote log path')
+    parser.add_argument('--interval', type=float, default=FLUSH_SECONDS, help='Seconds between batches')
+    parser.add_argument('--postgres', help='DSN of a local Postgres stand-in instead of Supabase')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8788)
+    parser.add_argument('--no-server', action='store_true', help='Only run the worker')
+    args = parser.parse_args()
+
+    vote_log = VoteLog(args.log)
+    store = PostgresStore(args.postgres) if args.postgres else SupabaseStore()
+    worker = VoteIngestWorker(vote_log, store, args.interval)
+
+    if args.no_server:
+        worker.run_forever()
+    else:
+        threading.Thread(target=worker.run_forever, daemon=True).start()
+        serve(vote_log, args.host, args.port)